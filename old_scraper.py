@@ -1,23 +1,37 @@
 
 import os
+import io
 import time
+import asyncio
 import logging
 import re
+import functools
+import subprocess
+import threading
 import whisper
+import torch
 import warnings
+import httpx
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pytubefix import YouTube
 from pytubefix.cli import on_progress
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import List, Dict, Optional, Set, Tuple
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+from sqlalchemy import create_engine, delete, select, func, text, Column, Index, Integer, String, Text, Date, DateTime, Boolean
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import IntegrityError
 
 # Configure warning for torch dtype FP16. because by default is using FP32
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -30,12 +44,114 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# YouTube Data API v3 search endpoint (called directly, the google client is blocking)
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_CHANNELS_URL = "https://www.googleapis.com/youtube/v3/channels"
+YOUTUBE_PLAYLIST_ITEMS_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
+
+# Partial response: only the fields _parse_items reads, about a fifth of the full payload
+SEARCH_FIELDS = "items(id/videoId,snippet(title,channelTitle,publishedAt)),nextPageToken"
+
+# search.list returns at most 500 results per query, so queries are split into
+# monthly publish-date windows starting here, each with its own 500 cap.
+# From 2015 that is well over 100 windows of at least 100 quota units each, so
+# the first walk of a query spans several quota days (checkpoints carry it over);
+# set YOUTUBE_SEARCH_START (YYYY-MM-DD) to search a shorter range.
+SEARCH_START = datetime.strptime(
+    os.getenv('YOUTUBE_SEARCH_START', '2015-01-01'), '%Y-%m-%d'
+).replace(tzinfo=timezone.utc)
+
+# Data API quota: search.list costs 100 units of the default 10,000/day, which
+# resets at midnight Pacific time. Stop at 9,500 to leave room for other calls.
+SEARCH_QUOTA_COST = 100
+LIST_QUOTA_COST = 1
+DAILY_QUOTA_LIMIT = 9500
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+# Whisper expects 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Transcript cleanup patterns and basic Indonesian language indicators
+_TIMESTAMP_RE = re.compile(r'\d+:\d+:\d+\s*\n')
+_ID_WORDS = frozenset({
+    'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
+    'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
+})
+
+# Number of videos buffered before their rows are written in one batch
+INSERT_BATCH_SIZE = 100
+
+def parse_published_at(value: str) -> datetime:
+    """Parse a Data API timestamp such as 2024-01-31T12:00:00Z into an aware UTC datetime"""
+    if ciso8601 is not None:
+        return ciso8601.parse_datetime(value)
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+class QuotaExhausted(Exception):
+    """Raised when the daily Data API quota budget is used up"""
+
+def quota_day_start() -> datetime:
+    """Start of the current Data API quota day (midnight Pacific time)"""
+    return datetime.now(QUOTA_TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def format_rfc3339(value: datetime) -> str:
+    """Format a datetime as the RFC 3339 UTC timestamp the Data API expects"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def month_windows(start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+    """
+    Split [start, end) into consecutive calendar-month windows, oldest first.
+
+    :param start: Beginning of the first window
+    :param end: End of the last window
+    :return: List of (published_after, published_before) pairs
+    """
+    windows = []
+    window_start = start
+    while window_start < end:
+        if window_start.month == 12:
+            window_end = window_start.replace(year=window_start.year + 1, month=1, day=1)
+        else:
+            window_end = window_start.replace(month=window_start.month + 1, day=1)
+        window_end = min(window_end, end)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+class RateLimiter:
+    """Token bucket allowing at most `rate` requests per second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self.updated_at
+                self.tokens = min(self.rate, self.tokens + elapsed * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 Base = declarative_base()
 
 class YouTubeTranscriptCorpus(Base):
     __tablename__ = 'youtube_transcript_corpus'
+    __table_args__ = (
+        Index('ix_corpus_language', 'language'),
+        Index('ix_corpus_published_at', 'published_at'),
+    )
      
-    id = Column(String(50), unique=True, nullable=False, primary_key=True)  # YouTube video ID
+    id = Column(String(50), nullable=False, primary_key=True)  # YouTube video ID
     title = Column(String(500), nullable=False)
     channel_title = Column(String(500))
     published_at = Column(DateTime)
@@ -47,120 +163,398 @@ class YouTubeTranscriptCorpus(Base):
 class YouTubeProcessedData(Base):
     __tablename__ = 'youtube_processed_data'
     
-    id = Column(String(50), unique=True, nullable=False, primary_key=True)  # YouTube video ID
+    id = Column(String(50), nullable=False, primary_key=True)  # YouTube video ID
     processed_at = Column(DateTime, default=datetime.utcnow)
 
+class YouTubeSearchCheckpoint(Base):
+    __tablename__ = 'youtube_search_checkpoint'
+
+    query = Column(String(500), primary_key=True)
+    # Resume point: page token inside the window that ends at published_before
+    next_page_token = Column(String(100))
+    published_before = Column(DateTime(timezone=True))
+    # High-water mark: every window before this has been searched completely
+    searched_until = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+class YouTubeQuotaUsage(Base):
+    __tablename__ = 'youtube_quota_usage'
+
+    # Calendar day in Pacific time, when the Data API quota resets
+    quota_day = Column(Date, primary_key=True)
+    units_used = Column(Integer, nullable=False, default=0)
+
 class YouTubeTranscriptScraper:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 20):
         """
         Initialize YouTube Transcript Scraper
         
-        :param api_key: YouTube Data API v3 key
-        :param database_url: PostgreSQL database connection string
+        :param max_concurrency: Maximum number of concurrent caption requests.
+            Videos falling back to Whisper are bounded separately.
         """
         # YouTube API setup
         self.api_key = os.getenv('YOUTUBE_API_KEY')
         if not self.api_key:
             raise ValueError("No YouTube API key provided")
         
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        # HTTP/2 multiplexes the concurrent API calls over one pooled TLS connection
+        self.http = httpx.AsyncClient(timeout=30, http2=True)
+
+        # Seed channels whose uploads are enumerated before falling back to search,
+        # e.g. YOUTUBE_CHANNEL_IDS=UCxxxx,UCyyyy
+        self.channel_ids = [channel_id.strip()
+                            for channel_id in os.getenv('YOUTUBE_CHANNEL_IDS', '').split(',')
+                            if channel_id.strip()]
         
         # Database setup
         self.database_url = os.getenv('DATABASE_URL')
         if not self.database_url:
             raise ValueError("No database URL provided")
         
-        self.engine = create_engine(self.database_url)
+        self.engine = create_engine(
+            self.database_url,
+            pool_size=10,
+            max_overflow=20,
+            pool_timeout=30,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            # Send executemany INSERTs as multi-row VALUES pages
+            executemany_mode='values_plus_batch',
+            insertmanyvalues_page_size=500
+        )
         Base.metadata.create_all(self.engine)
+        # Each blocking DB call opens its own short session in a worker thread,
+        # so concurrent videos never share a transaction or block the event loop
         self.Session = sessionmaker(bind=self.engine)
+
+        # Search quota already spent today by earlier runs, loaded by run()
+        self.quota_day = quota_day_start()
+        self.quota_used = 0
     
-    def search_videos(self, 
-                query: str, 
-                max_results: int = 50, 
-                language: str = 'id') -> List[Dict]:
-      """
-      Search for videos using YouTube Data API with optimized request handling
-      to minimize API quota usage.
-
-      :param query: Search query
-      :param max_results: Maximum number of results to retrieve
-      :param language: Language preference
-      :return: List of video metadata
-      """
-      videos = []
-      try:
-          # Calculate the number of API calls needed
-          # YouTube API allows max 50 results per request
-          items_per_request = 50
-          required_requests = (max_results + items_per_request - 1) // items_per_request
-          
-          # Make a single request if max_results <= 50
-          if max_results <= items_per_request:
-              request = self.youtube.search().list(
-                  q=query,
-                  type='video',
-                  part='id,snippet',
-                  maxResults=max_results,
-                  relevanceLanguage=language
-              )
-              response = request.execute()
-              
-              for item in response.get('items', []):
-                  video_info = {
-                      'video_id': item['id']['videoId'],
-                      'title': item['snippet']['title'],
-                      'channel_title': item['snippet']['channelTitle'],
-                      'published_at': datetime.fromisoformat(
-                          item['snippet']['publishedAt'].replace('Z', '+00:00')
-                      )
-                  }
-                  videos.append(video_info)
-                  
-          # Handle pagination if more results are needed
-          else:
-              page_token = None
-              for _ in range(required_requests):
-                  remaining_results = max_results - len(videos)
-                  if remaining_results <= 0:
-                      break
-                      
-                  request = self.youtube.search().list(
-                      q=query,
-                      type='video',
-                      part='id,snippet',
-                      maxResults=min(items_per_request, remaining_results),
-                      relevanceLanguage=language,
-                      pageToken=page_token
-                  )
-                  response = request.execute()
-                  
-                  for item in response.get('items', []):
-                      video_info = {
-                          'video_id': item['id']['videoId'],
-                          'title': item['snippet']['title'],
-                          'channel_title': item['snippet']['channelTitle'],
-                          'published_at': datetime.fromisoformat(
-                              item['snippet']['publishedAt'].replace('Z', '+00:00')
-                          )
-                      }
-                      videos.append(video_info)
-                  
-                  # Get next page token
-                  page_token = response.get('nextPageToken')
-                  if not page_token:
-                      break
-                      
-                  # Add delay between requests to prevent rate limiting
-                  time.sleep(1)
-                  
-                  # Log the progress
-                  logger.info(f"Fetched {len(videos)}/{max_results} videos...")
-      
-      except Exception as e:
-          logger.error(f"Error searching videos: {e}")
-      
-      # Ensure we don't exceed max_results
-      return videos[:max_results]
+        # Concurrency setup: bound in-flight caption requests, run blocking libraries in threads
+        self.http_sem = asyncio.Semaphore(max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+        # Separate request budgets per endpoint: Data API search, timedtext
+        # (transcript API) and the pytubefix audio download used by Whisper
+        self.search_limiter = RateLimiter(5)
+        self.transcript_limiter = RateLimiter(10)
+        self.download_limiter = RateLimiter(2)
+
+        # Corpus rows waiting for the next batch insert
+        self.pending_corpus: List[Dict] = []
+
+        # Load Whisper once; inference on a single model is not reentrant
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Using device: {self.device}")
+        self.whisper_model = whisper.load_model("turbo", device=self.device)
+        self.whisper_lock = threading.Lock()
+        # Videos in the Whisper path at once: each holds a download, an ffmpeg process
+        # and decoded audio, so keep it to one on a GPU and let CPU runs overlap
+        # downloading and decoding with the (still serialized) inference
+        self.whisper_sem = asyncio.BoundedSemaphore(
+            1 if self.device == "cuda" else max(1, (os.cpu_count() or 2) // 2)
+        )
+
+    async def close(self):
+        """Release the HTTP client and worker threads"""
+        await self.http.aclose()
+        self.executor.shutdown(wait=False)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call (transcript API, pytubefix, Whisper) in the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def _search(self, **params) -> Dict:
+        """
+        Issue a single search.list request against the YouTube Data API.
+
+        :param params: search.list query parameters
+        :return: Decoded JSON response
+        """
+        params = {key: value for key, value in params.items() if value is not None}
+        params.update(key=self.api_key, type='video', part='id,snippet', fields=SEARCH_FIELDS)
+        await self.search_limiter.acquire()
+        response = await self.http.get(YOUTUBE_SEARCH_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def _load_quota_used(self) -> int:
+        """
+        Read the Data API quota recorded for the current quota day.
+
+        :return: Quota units used today
+        """
+        session = self.Session()
+        try:
+            return session.scalar(
+                select(YouTubeQuotaUsage.units_used)
+                .where(YouTubeQuotaUsage.quota_day == self.quota_day.date())
+            ) or 0
+        finally:
+            session.close()
+
+    def _add_quota_used(self, session, quota_cost: int):
+        """
+        Add spent units to today's quota row inside the caller's transaction.
+
+        :param session: Database session
+        :param quota_cost: Quota units spent
+        """
+        statement = insert(YouTubeQuotaUsage).values(quota_day=self.quota_day.date(), units_used=quota_cost)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['quota_day'],
+            set_={'units_used': YouTubeQuotaUsage.units_used + statement.excluded.units_used}
+        ))
+
+    def record_quota(self, quota_cost: int):
+        """
+        Persist quota spent outside search, e.g. on channel and playlist listing.
+
+        :param quota_cost: Quota units spent
+        """
+        session = self.Session()
+        try:
+            self._add_quota_used(session, quota_cost)
+            session.commit()
+        finally:
+            session.close()
+
+    def load_checkpoint(self, query: str) -> Optional[YouTubeSearchCheckpoint]:
+        """
+        Load the stored search position for a query.
+
+        :param query: Search query
+        :return: Checkpoint, or None if the query has not been searched yet
+        """
+        session = self.Session()
+        try:
+            checkpoint = session.get(YouTubeSearchCheckpoint, query)
+            if checkpoint is not None:
+                session.expunge(checkpoint)
+            return checkpoint
+        finally:
+            session.close()
+
+    def save_checkpoint(self,
+                        query: str,
+                        next_page_token: Optional[str],
+                        published_before: Optional[datetime],
+                        quota_cost: int = 0,
+                        searched_until: Optional[datetime] = None):
+        """
+        Persist the search position for a query and the quota it consumed.
+
+        :param query: Search query
+        :param next_page_token: Page token to resume from, None to start the window over
+        :param published_before: End of the window being searched
+        :param quota_cost: Quota units spent since the last save
+        :param searched_until: New high-water mark once a window is finished
+        """
+        session = self.Session()
+        try:
+            checkpoint = session.get(YouTubeSearchCheckpoint, query)
+            if checkpoint is None:
+                checkpoint = YouTubeSearchCheckpoint(query=query)
+                session.add(checkpoint)
+            checkpoint.next_page_token = next_page_token
+            checkpoint.published_before = published_before
+            if quota_cost:
+                self._add_quota_used(session, quota_cost)
+            if searched_until is not None:
+                checkpoint.searched_until = searched_until
+            checkpoint.updated_at = datetime.now(timezone.utc)
+            session.commit()
+        finally:
+            session.close()
+
+    def _check_quota(self):
+        """Roll the budget over at midnight Pacific time and raise once it is used up"""
+        today = quota_day_start()
+        if today > self.quota_day:
+            self.quota_day, self.quota_used = today, 0
+
+        if self.quota_used >= DAILY_QUOTA_LIMIT:
+            raise QuotaExhausted(f"Search quota budget of {DAILY_QUOTA_LIMIT} units used up")
+
+    async def _search_with_budget(self,
+                                  query: str,
+                                  published_before: Optional[datetime],
+                                  **params) -> Dict:
+        """
+        Issue a search.list request charged against the daily quota budget and
+        checkpoint the next page token once it succeeds.
+
+        :param query: Search query
+        :param published_before: End of the window being searched
+        :param params: Remaining search.list query parameters
+        :return: Decoded JSON response
+        """
+        self._check_quota()
+
+        try:
+            response = await self._search(
+                q=query,
+                publishedBefore=format_rfc3339(published_before) if published_before else None,
+                **params
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403 and 'quotaExceeded' in e.response.text:
+                self.quota_used = DAILY_QUOTA_LIMIT
+                raise QuotaExhausted("YouTube API reported quotaExceeded") from e
+            raise
+
+        self.quota_used += SEARCH_QUOTA_COST
+        await self._run_blocking(self.save_checkpoint, query, response.get('nextPageToken'),
+                                 published_before, SEARCH_QUOTA_COST)
+        return response
+
+    async def _list(self, url: str, **params) -> Dict:
+        """
+        Issue a 1-unit Data API list request (channels.list, playlistItems.list).
+
+        :param url: Endpoint URL
+        :param params: Query parameters
+        :return: Decoded JSON response
+        """
+        self._check_quota()
+
+        params = {key: value for key, value in params.items() if value is not None}
+        params['key'] = self.api_key
+        await self.search_limiter.acquire()
+        response = await self.http.get(url, params=params)
+        response.raise_for_status()
+        self.quota_used += LIST_QUOTA_COST
+        return response.json()
+
+    async def fetch_channel_uploads(self, channel_id: str, max_results: int = 500) -> List[Dict]:
+        """
+        List a channel's uploads through its uploads playlist. This costs 1 quota
+        unit per 50 videos instead of 100 for search.list.
+
+        :param channel_id: YouTube channel ID
+        :param max_results: Maximum number of videos to retrieve
+        :return: List of video metadata
+        """
+        videos = []
+        list_calls = 0
+        try:
+            response = await self._list(YOUTUBE_CHANNELS_URL, id=channel_id, part='contentDetails')
+            list_calls += 1
+            items = response.get('items', [])
+            if not items:
+                logger.warning(f"Channel {channel_id} not found")
+                return videos
+            uploads_playlist_id = items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+            page_token = None
+            while len(videos) < max_results:
+                response = await self._list(
+                    YOUTUBE_PLAYLIST_ITEMS_URL,
+                    playlistId=uploads_playlist_id,
+                    part='snippet,contentDetails',
+                    maxResults=50,
+                    pageToken=page_token
+                )
+                list_calls += 1
+                for item in response.get('items', []):
+                    # Private and deleted uploads have no publish time
+                    if 'videoPublishedAt' not in item['contentDetails']:
+                        continue
+                    videos.append({
+                        'video_id': item['contentDetails']['videoId'],
+                        'title': item['snippet']['title'],
+                        'channel_title': item['snippet']['channelTitle'],
+                        'published_at': parse_published_at(item['contentDetails']['videoPublishedAt'])
+                    })
+
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+
+                logger.info(f"Fetched {len(videos)} uploads from channel {channel_id}...")
+
+        except QuotaExhausted as e:
+            logger.warning(f"Stopping upload listing for channel {channel_id}: {e}")
+
+        except Exception as e:
+            logger.error(f"Error listing uploads for channel {channel_id}: {e}")
+
+        finally:
+            # Record the spent units so the next run's budget includes them
+            if list_calls:
+                await self._run_blocking(self.record_quota, list_calls * LIST_QUOTA_COST)
+
+        return videos[:max_results]
+
+    def _parse_items(self, response: Dict) -> List[Dict]:
+        """
+        Extract video metadata from a search.list response.
+
+        :param response: Decoded search.list response
+        :return: List of video metadata
+        """
+        return [{
+            'video_id': item['id']['videoId'],
+            'title': item['snippet']['title'],
+            'channel_title': item['snippet']['channelTitle'],
+            'published_at': parse_published_at(item['snippet']['publishedAt'])
+        } for item in response.get('items', [])]
+
+    async def search_videos(self,
+                            query: str,
+                            max_results: int = 50,
+                            language: str = 'id',
+                            published_after: Optional[datetime] = None,
+                            published_before: Optional[datetime] = None,
+                            page_token: Optional[str] = None) -> Tuple[List[Dict], bool]:
+        """
+        Search for videos using YouTube Data API with optimized request handling
+        to minimize API quota usage.
+
+        :param query: Search query
+        :param max_results: Maximum number of results to retrieve
+        :param language: Language preference
+        :param published_after: Only return videos published on or after this time
+        :param published_before: Only return videos published before this time
+        :param page_token: Page token to resume a previously interrupted search from
+        :return: List of video metadata, and whether the search ran out of result pages
+        """
+        videos = []
+        completed = False
+        try:
+            # YouTube API allows max 50 results per request
+            items_per_request = 50
+            while len(videos) < max_results:
+                response = await self._search_with_budget(
+                    query,
+                    published_before,
+                    maxResults=min(items_per_request, max_results - len(videos)),
+                    relevanceLanguage=language,
+                    publishedAfter=format_rfc3339(published_after) if published_after else None,
+                    pageToken=page_token
+                )
+                videos.extend(self._parse_items(response))
+
+                # Get next page token
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    completed = True
+                    break
+
+                # Log the progress
+                logger.info(f"Fetched {len(videos)}/{max_results} videos...")
+
+        except QuotaExhausted as e:
+            # Keep the pages fetched so far; the checkpoint resumes after them
+            logger.warning(f"Stopping search for '{query}': {e}")
+
+        except Exception as e:
+            logger.error(f"Error searching videos: {e}")
+
+        # Ensure we don't exceed max_results
+        return videos[:max_results], completed
         
     
     def clean_transcript(self, text: str) -> str:
@@ -170,28 +564,25 @@ class YouTubeTranscriptScraper:
         :param text: Raw transcript text
         :return: Cleaned transcript text
         """
-        # Remove timestamps, extra whitespaces
-        text = re.sub(r'\d+:\d+:\d+\s*\n', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Remove timestamps (they only occur at line ends), extra whitespaces
+        if '\n' in text:
+            text = _TIMESTAMP_RE.sub('', text)
+        words = text.split()
         
         # Filter out very short or non-Indonesian looking transcripts
-        if len(text.split()) < 10:
+        if len(words) < 10:
             return ""
         
         # Basic Indonesian language detection 
-        # (rough check for Indonesian-like words or patterns)
-        indonesian_indicators = [
-            'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
-            'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
-        ]
-        if not any(word in text.lower() for word in indonesian_indicators):
+        # (rough check for Indonesian words)
+        if _ID_WORDS.isdisjoint(word.lower() for word in words):
             return ""
         
-        return text
+        return ' '.join(words)
     
-    def get_transcript(self, 
-                       video_id: str, 
-                       preferred_languages: List[str] = ['id', 'en']) -> Optional[Dict]:
+    async def get_transcript(self,
+                             video_id: str,
+                             preferred_languages: List[str] = ['id', 'en']) -> Optional[Dict]:
         """
         Retrieve transcript for a given video with multiple fallback methods.
 
@@ -200,44 +591,36 @@ class YouTubeTranscriptScraper:
         :return: Transcript dictionary or None
         """
         try:
-            # Attempt to fetch transcript in preferred languages
-            transcript_list = YouTubeTranscriptApi.get_transcript(
-                video_id, 
-                languages=preferred_languages
-            )
-            
-            # Combine transcript text
-            full_transcript = ' '.join([entry['text'] for entry in transcript_list])
-            cleaned_transcript = self.clean_transcript(full_transcript)
-            
-            if cleaned_transcript:
-                return {
-                    'transcript_text': cleaned_transcript,
-                    'language': transcript_list[0].get('language', 'unknown'),
-                    'has_caption': True
-                }
+            # One listing request, then pick the best track locally
+            async with self.http_sem:
+                await self.transcript_limiter.acquire()
+                try:
+                    available_transcripts = await self._run_blocking(YouTubeTranscriptApi.list_transcripts, video_id)
+                    transcript = self._select_transcript(available_transcripts, preferred_languages)
+                except TranscriptsDisabled:
+                    transcript = None
 
-        except (NoTranscriptFound, TranscriptsDisabled) as e:
-            try:
-                # Attempt to fetch auto-generated transcript if available
-                available_transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
-                
-                for transcript in available_transcripts:
-                    if transcript.is_generated:
-                        full_transcript = ' '.join([entry['text'] for entry in transcript.fetch()])
-                        cleaned_transcript = self.clean_transcript(full_transcript)
-                        
-                        if cleaned_transcript:
-                            return {
-                                'transcript_text': cleaned_transcript,
-                                'language': transcript.language_code,
-                                'has_caption': True
-                            }
-            except Exception:
-                pass
+                if transcript is not None:
+                    await self.transcript_limiter.acquire()
+                    entries = await self._run_blocking(transcript.fetch)
+
+            if transcript is not None:
+                # Combine transcript text
+                full_transcript = ' '.join([entry['text'] for entry in entries])
+                cleaned_transcript = self.clean_transcript(full_transcript)
 
-            # Fallback to local Whisper transcription
-            transcript_text = self.get_transcript_with_whisper(video_id)
+                if cleaned_transcript:
+                    return {
+                        'transcript_text': cleaned_transcript,
+                        'language': transcript.language_code,
+                        'has_caption': True
+                    }
+                return None
+
+            # Fallback to local Whisper transcription, outside the caption slots
+            async with self.whisper_sem:
+                await self.download_limiter.acquire()
+                transcript_text = await self._run_blocking(self.get_transcript_with_whisper, video_id)
             if transcript_text:
                 return {
                     'transcript_text': transcript_text,
@@ -251,7 +634,50 @@ class YouTubeTranscriptScraper:
         except Exception as e:
             logger.error(f"Unexpected error getting transcript for {video_id}: {e}")
             return None
+
+    @staticmethod
+    def _select_transcript(transcripts, preferred_languages: List[str]):
+        """
+        Pick a caption track: manual in a preferred language, then generated in a
+        preferred language, then any generated track.
+
+        :param transcripts: TranscriptList from list_transcripts
+        :param preferred_languages: List of preferred language codes
+        :return: Transcript, or None if the video has no usable captions
+        """
+        for find in (transcripts.find_manually_created_transcript,
+                     transcripts.find_generated_transcript):
+            try:
+                return find(preferred_languages)
+            except NoTranscriptFound:
+                pass
+        return next((transcript for transcript in transcripts if transcript.is_generated), None)
         
+    def load_audio(self, yt: YouTube) -> np.ndarray:
+        """
+        Download the audio stream into memory and decode it with ffmpeg,
+        without writing an intermediate file.
+
+        :param yt: pytubefix YouTube object
+        :return: Mono float32 samples at WHISPER_SAMPLE_RATE
+        """
+        # Lowest-bitrate audio track: it is downmixed to 16 kHz mono anyway
+        buffer = io.BytesIO()
+        yt.streams.filter(only_audio=True).order_by('abr').asc().first().stream_to_buffer(buffer)
+
+        process = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:',
+             '-f', 's16le', '-ac', '1', '-ar', str(WHISPER_SAMPLE_RATE), '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        pcm, error = process.communicate(buffer.getvalue())
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode audio: {error.decode(errors='ignore')}")
+
+        return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
     def get_transcript_with_whisper(self, video_id: str) -> Optional[str]:
         """
         Retrieve transcript using Whisper if other methods fail.
@@ -263,33 +689,31 @@ class YouTubeTranscriptScraper:
             youtube_url = f"https://www.youtube.com/watch?v={video_id}"
             yt = YouTube(youtube_url, on_progress_callback=on_progress)
             
-            download_dir = os.path.join(os.getcwd(), 'downloaded_audio')
-            os.makedirs(download_dir, exist_ok=True)
-            
-            temp_audio_path = os.path.join(download_dir, f"{video_id}.mp3")    
-
             # Retry up to 3 times if there's connection timeout issue
             for attempt in range(3): 
                 try:
                     logger.info(f"Download {yt.title}")
-                    print(f"Temporary audio file path: {temp_audio_path}")
-                    
-                    ys = yt.streams.filter(only_audio=True).first()
-                    ys.download(output_path=os.path.dirname(temp_audio_path), filename=f"{video_id}.mp3")
+                    audio = self.load_audio(yt)
 
-                    if os.path.exists(temp_audio_path) and os.path.getsize(temp_audio_path) > 0:
-                        logger.info("Audio file downloaded successfully.")
+                    if audio.size > 0:
+                        logger.info("Audio downloaded successfully.")
                     else:
-                        logger.error("Downloaded audio file is empty or not found.")
+                        logger.error("Downloaded audio is empty.")
                     
                     # Transcribe audio using Whisper
-                    model = whisper.load_model("turbo")
-                    result = model.transcribe(temp_audio_path, language="id")
+                    with self.whisper_lock:
+                        result = self.whisper_model.transcribe(
+                            audio,
+                            language="id",
+                            # Whisper casts the weights to half precision per layer
+                            # and keeps LayerNorm in FP32
+                            fp16=self.device == "cuda",
+                            # Keeps long talks from looping on earlier text and
+                            # shortens the decoder prompt on every window
+                            condition_on_previous_text=False
+                        )
                     transcript_text = result['text']
                     
-                    # Clean up temp file
-                    os.remove(temp_audio_path)
-                    
                     return self.clean_transcript(transcript_text)
                 
                 except Exception as e:
@@ -300,89 +724,253 @@ class YouTubeTranscriptScraper:
             logger.error(f"Error during Whisper transcription for video {video_id}: {e}")
             return None
     
-    def build_corpus(self, 
-                    query: str, 
-                    max_results: int = 50, 
-                    language: str = 'id') -> int:
+    def claim_videos(self, video_ids: List[str]) -> Set[str]:
         """
-        Build corpus from YouTube videos
-        
-        :param query: Search query
-        :param max_results: Maximum number of results
-        :param language: Language preference
-        :return: Number of videos processed
+        Mark videos as processed before any work is done on them. The INSERT
+        succeeds only for IDs no earlier run or concurrent worker has claimed,
+        so no row locks are held during the slow transcript fetch.
+
+        :param video_ids: Candidate YouTube video IDs
+        :return: IDs claimed by this call
         """
-        # Create database session
+        if not video_ids:
+            return set()
+
         session = self.Session()
-        processed_count = 0
+        try:
+            # Videos already in the corpus without a processed marker are skipped too
+            in_corpus = set(session.execute(
+                select(YouTubeTranscriptCorpus.id).where(YouTubeTranscriptCorpus.id.in_(video_ids))
+            ).scalars())
+            candidates = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in in_corpus]
+            if not candidates:
+                return set()
+
+            claimed = set(session.execute(
+                insert(YouTubeProcessedData)
+                .values([{'id': video_id} for video_id in candidates])
+                .on_conflict_do_nothing(index_elements=['id'])
+                .returning(YouTubeProcessedData.id)
+            ).scalars())
+            session.commit()
+            return claimed
 
+        finally:
+            session.close()
+
+    def analyze(self):
+        """Refresh planner statistics so the batched id lookups stay on the primary key index"""
+        with self.engine.begin() as connection:
+            for table in (YouTubeProcessedData.__tablename__, YouTubeTranscriptCorpus.__tablename__):
+                connection.execute(text(f"ANALYZE {table}"))
+
+    async def flush_pending(self):
+        """Write buffered corpus rows in a single transaction off the event loop"""
+        corpus_rows, self.pending_corpus = self.pending_corpus, []
+        if corpus_rows:
+            await self._run_blocking(self._insert_corpus_rows, corpus_rows)
+
+    def _insert_corpus_rows(self, corpus_rows: List[Dict]):
+        """
+        Insert corpus rows, leaving out IDs another worker already wrote.
+        If the batch cannot be written, the videos' claims are released so a
+        later run transcribes them again instead of skipping them for good.
+
+        :param corpus_rows: Corpus rows to insert
+        """
+        session = self.Session()
         try:
-            videos = self.search_videos(query, max_results, language)
-            
-            for video in videos:
-                video_id = video['video_id']
-                video_title = video['title']
+            # ON CONFLICT DO NOTHING lets the database drop rows another worker already wrote
+            session.execute(
+                insert(YouTubeTranscriptCorpus).on_conflict_do_nothing(index_elements=['id']),
+                corpus_rows
+            )
+            session.commit()
+            logger.info(f"Stored batch of {len(corpus_rows)} transcripts")
 
-                # Start a new transaction for each video
-                try:
-                    # Check if video exists in either table using SELECT FOR UPDATE
-                    # This locks the rows and prevents race conditions
-                    existing_corpus = session.query(YouTubeTranscriptCorpus).filter_by(id=video_id)\
-                        .with_for_update(skip_locked=True).first()
-                    existing_processed = session.query(YouTubeProcessedData).filter_by(id=video_id)\
-                        .with_for_update(skip_locked=True).first()
-
-                    if existing_corpus or existing_processed:
-                        logger.info(f"Skipping already processed video: {video_title} (ID: {video_id})")
-                        session.commit()
-                        continue
-                    
-                    # Mark as processed first
-                    processed_entry = YouTubeProcessedData(id=video_id)
-                    session.add(processed_entry)
-                    session.flush()  # Ensure the processed entry is written before continuing
-                    
-                    # Get and process transcript
-                    transcript_data = self.get_transcript(video_id)
-                    
-                    if transcript_data and transcript_data['transcript_text']:
-                        corpus_entry = YouTubeTranscriptCorpus(
-                            id=video_id,
-                            title=video_title,
-                            channel_title=video['channel_title'],
-                            published_at=video['published_at'],
-                            transcript_text=transcript_data['transcript_text'],
-                            language=transcript_data.get('language', 'unknown'),
-                            has_caption=transcript_data.get('has_caption', False)
-                        )
-                        
-                        session.add(corpus_entry)
-                        session.commit()
-                        processed_count += 1
-                        logger.info(f"Processed video: {video_title}")
-                    else:
-                        # If no transcript, still commit the processed entry
-                        session.commit()
-                        
-                except IntegrityError as e:
-                    session.rollback()
-                    logger.warning(f"Race condition occurred for video {video_id}, skipping: {str(e)}")
-                    continue
-                    
-                # Prevent rate limiting
-                time.sleep(1)
-            
         except Exception as e:
-            logger.error(f"Error building corpus: {e}")
             session.rollback()
-            raise
-            
+            logger.error(f"Error storing batch: {e}")
+            try:
+                session.execute(
+                    delete(YouTubeProcessedData)
+                    .where(YouTubeProcessedData.id.in_([row['id'] for row in corpus_rows]))
+                )
+                session.commit()
+                logger.info(f"Released {len(corpus_rows)} claimed videos for a later run")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error releasing claimed videos: {e}")
+
         finally:
+            # Return the connection to the pool
             session.close()
-        
+
+    async def process_video(self, video: Dict, claimed_ids: Set[str]) -> bool:
+        """
+        Transcribe a single video and queue its corpus row for the next batch insert.
+
+        :param video: Video metadata from search_videos
+        :param claimed_ids: IDs this run claimed in youtube_processed_data
+        :return: True if a corpus entry was queued
+        """
+        video_id = video['video_id']
+        video_title = video['title']
+
+        if video_id not in claimed_ids:
+            logger.info(f"Skipping already processed video: {video_title} (ID: {video_id})")
+            return False
+
+        # Get and process transcript; the claim already marks it processed
+        # even if no transcript is found
+        transcript_data = await self.get_transcript(video_id)
+
+        queued = False
+        if transcript_data and transcript_data['transcript_text']:
+            self.pending_corpus.append({
+                'id': video_id,
+                'title': video_title,
+                'channel_title': video['channel_title'],
+                'published_at': video['published_at'],
+                'transcript_text': transcript_data['transcript_text'],
+                'language': transcript_data.get('language', 'unknown'),
+                'has_caption': transcript_data.get('has_caption', False)
+            })
+            logger.info(f"Processed video: {video_title}")
+            queued = True
+
+        if len(self.pending_corpus) >= INSERT_BATCH_SIZE:
+            await self.flush_pending()
+
+        return queued
+
+    async def process_videos(self, videos: List[Dict]) -> int:
+        """
+        Transcribe and store a batch of search results.
+
+        :param videos: Video metadata from search_videos
+        :return: Number of videos processed
+        """
+        # Claim the whole result set in one round-trip instead of a locked SELECT per video
+        claimed_ids = await self._run_blocking(self.claim_videos, [video['video_id'] for video in videos])
+
+        # Videos are independent, so overlap their network waits
+        results = await asyncio.gather(*(self.process_video(video, claimed_ids) for video in videos))
+        await self.flush_pending()
+        return sum(results)
+
+    async def build_channel_corpus(self, max_results: int = 500) -> int:
+        """
+        Build corpus from the uploads of the seed channels
+
+        :param max_results: Maximum number of videos per channel
+        :return: Number of videos processed
+        """
+        processed_count = 0
+        for channel_id in self.channel_ids:
+            videos = await self.fetch_channel_uploads(channel_id, max_results)
+            logger.info(f"Found {len(videos)} uploads for channel {channel_id}")
+            processed_count += await self.process_videos(videos)
+
+            if self.quota_used >= DAILY_QUOTA_LIMIT:
+                raise QuotaExhausted(f"Quota used up while listing channel {channel_id}")
+
+        logger.info(f"Total processed videos from seed channels: {processed_count}")
+        return processed_count
+
+    async def build_corpus(self,
+                           query: str,
+                           max_results: int = 50,
+                           language: str = 'id',
+                           published_after: datetime = SEARCH_START,
+                           published_before: Optional[datetime] = None) -> int:
+        """
+        Build corpus from YouTube videos, searching one month of uploads at a
+        time so every window can return up to max_results videos. Windows are
+        walked oldest first from the stored high-water mark, so later runs only
+        search uploads newer than the last completed window.
+
+        :param query: Search query
+        :param max_results: Maximum number of results per monthly window
+        :param language: Language preference
+        :param published_after: Start of the searched publish-date range
+        :param published_before: End of the searched publish-date range (default: now)
+        :return: Number of videos processed
+        """
+        published_before = published_before or datetime.now(timezone.utc)
+
+        # Resume where an earlier run stopped
+        checkpoint = await self._run_blocking(self.load_checkpoint, query)
+        if checkpoint is not None and checkpoint.searched_until is not None:
+            published_after = max(published_after, checkpoint.searched_until)
+            logger.info(f"Resuming '{query}' after {published_after:%Y-%m-%d}")
+
+        processed_count = 0
+
+        for window_start, window_end in month_windows(published_after, published_before):
+            # A page token is only valid for the exact window it was issued in
+            page_token = None
+            if checkpoint is not None and checkpoint.published_before == window_end:
+                page_token = checkpoint.next_page_token
+            videos, completed = await self.search_videos(
+                query, max_results, language,
+                published_after=window_start,
+                published_before=window_end,
+                page_token=page_token
+            )
+            logger.info(f"Found {len(videos)} videos for '{query}' between "
+                        f"{window_start:%Y-%m-%d} and {window_end:%Y-%m-%d}")
+
+            # Overlapping results are collapsed by the id primary key
+            processed_count += await self.process_videos(videos)
+
+            if self.quota_used >= DAILY_QUOTA_LIMIT:
+                # The page checkpoint already points inside this window
+                raise QuotaExhausted(f"Quota used up while searching '{query}'")
+
+            if not completed:
+                # Failed or cut short: the high-water mark must stay before
+                # this window, so the next run searches it again
+                logger.warning(f"Search for '{query}' stopped inside the window ending "
+                               f"{window_end:%Y-%m-%d}; resuming there next run")
+                break
+
+            # Window finished: the next run starts with the window after it
+            await self._run_blocking(self.save_checkpoint, query, None, None,
+                                     searched_until=window_end)
+
         logger.info(f"Total processed videos for query '{query}': {processed_count}")
         return processed_count
 
+async def run(scraper: YouTubeTranscriptScraper, queries: List[str]) -> int:
+    """
+    Build the corpus for every query on a single event loop
+
+    :param scraper: Initialized scraper
+    :param queries: Search queries to process
+    :return: Total number of videos processed
+    """
+    total_processed = 0
+    try:
+        scraper.quota_used = await asyncio.to_thread(scraper._load_quota_used)
+
+        # Channel uploads are ~100x cheaper in quota than search, so go through
+        # them first and leave search for discovering videos elsewhere
+        total_processed += await scraper.build_channel_corpus(max_results=500)
+
+        for query in queries:
+            logger.info(f"Processing query: {query}")
+            processed = await scraper.build_corpus(query, max_results=500)
+            total_processed += processed
+            await asyncio.to_thread(scraper.analyze)
+    except QuotaExhausted as e:
+        # Checkpoints are saved, so the next run picks up from here
+        logger.warning(f"{e}; resume after midnight Pacific time")
+    finally:
+        await scraper.close()
+
+    return total_processed
+
 def main():
     # Initialize scraper
     scraper = YouTubeTranscriptScraper()
@@ -444,13 +1032,9 @@ def main():
         "Kearifan lokal sebagai penuntun keselamatan di Parangtritis"
     ]
     
-    total_processed = 0
-    for query in queries:
-        logger.info(f"Processing query: {query}")
-        processed = scraper.build_corpus(query, max_results=500)
-        total_processed += processed
+    total_processed = asyncio.run(run(scraper, queries))
     
     logger.info(f"Overall total processed videos: {total_processed}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
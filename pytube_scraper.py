@@ -1,17 +1,25 @@
 import os
+import hashlib
+import mmap
 import time
 import logging
 import re
-import whisper
+import threading
+import multiprocessing
+import ctranslate2
 import warnings
+from faster_whisper import WhisperModel
 from pytubefix import Search, YouTube
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
+from pathlib import Path
 
+from diskcache import Cache
 from dotenv import load_dotenv
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Boolean, Integer, Null
+from sqlalchemy import create_engine, inspect, select, text, Column, CHAR, String, Text, DateTime, Boolean, Integer, Null
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
@@ -27,6 +35,81 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Transcripts survive between runs in an on-disk cache for a week
+CACHE_DIR = '.yt_cache'
+CACHE_TTL = 7 * 86400
+
+# Pause after each search page request; results themselves are not throttled
+SEARCH_PAGE_DELAY = 0.3
+
+# Audio files downloaded ahead of the transcription workers; bounds disk use
+# while keeping the GPU/CPU busy during the next download
+WHISPER_PREFETCH = 2
+
+# Corpus rows written per INSERT/commit
+INSERT_BATCH_SIZE = 50
+
+# Transcript cleanup patterns and basic Indonesian language indicators
+# Timestamp lines and whitespace runs are both replaced by one space in a single
+# pass; surrounding whitespace is folded into the timestamp match so no double
+# spaces are left behind
+_CLEAN_RE = re.compile(r'(?:\s*\d+:\d+:\d+\s*\n)+\s*|\s+')
+_ID_WORDS = (
+    'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
+    'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
+)
+# One case-insensitive scan for any indicator as a whole word
+_ID_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, _ID_WORDS)) + r')\b', re.IGNORECASE)
+
+def transcript_digest(text: str) -> str:
+    """16-byte BLAKE2b digest (32 hex characters) used to detect duplicate transcripts"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+class RateLimiter:
+    """Thread-safe token bucket allowing at most `rate` requests per second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def audio_digest(path: str) -> str:
+    """BLAKE2b hex digest of an audio file, read through mmap without copying it into memory"""
+    with open(path, 'rb') as audio_file:
+        if os.fstat(audio_file.fileno()).st_size == 0:
+            return hashlib.blake2b(b'').hexdigest()
+        with mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ) as audio_map:
+            return hashlib.blake2b(audio_map).hexdigest()
+
+# Whisper model of a transcription worker process, set by _init_whisper
+_worker_model = None
+
+def _init_whisper(device: str, compute_type: str, cpu_threads: int):
+    """Load the Whisper model once in each transcription worker process"""
+    global _worker_model
+    _worker_model = WhisperModel("large-v3-turbo", device=device,
+                                 compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _transcribe_audio(audio_path: str) -> str:
+    """Transcribe an audio file in a worker process and return the raw text"""
+    # VAD skips silent stretches before they reach the decoder
+    segments, _ = _worker_model.transcribe(audio_path, language="id", vad_filter=True)
+    return " ".join(segment.text for segment in segments)
+
 Base = declarative_base()
 
 class YouTubeTranscriptCorpus(Base):
@@ -38,14 +121,18 @@ class YouTubeTranscriptCorpus(Base):
     published_at = Column(DateTime, nullable=True)
     duration = Column(Integer)  # Duration in seconds
     transcript_text = Column(Text)
+    # transcript_digest(transcript_text); the unique index rejects duplicate transcripts
+    transcript_hash = Column(CHAR(32), unique=True, index=True)
     language = Column(String(10))
     has_caption = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class YouTubeTranscriptScraper:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         """
         Initialize YouTube Transcript Scraper
+
+        :param max_workers: Number of threads fetching captions in parallel
         """
         # Database setup
         self.database_url = os.getenv('DATABASE_URL')
@@ -55,6 +142,100 @@ class YouTubeTranscriptScraper:
         self.engine = create_engine(self.database_url)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        self._migrate_transcript_hash()
+
+        # Whisper input files, created once instead of per video
+        self._download_dir = Path.cwd() / 'downloaded_audio'
+        self._download_dir.mkdir(exist_ok=True)
+
+        # Whisper runs on the GPU when there is one: int8 weights with fp16
+        # activations on CUDA, plain int8 on CPU
+        self.device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        self.compute_type = "int8_float16" if self.device == "cuda" else "int8"
+        logger.info(f"Using device: {self.device} ({self.compute_type})")
+
+        # Transcription runs in worker processes so its GIL-bound pre/post
+        # processing never stalls the caption threads. One worker owns the GPU;
+        # on CPU each worker gets four inference threads. Workers are spawned
+        # (not forked) on first use and load the model once.
+        whisper_workers = 1 if self.device == "cuda" else max(1, (os.cpu_count() or 4) // 4)
+        self._whisper_pool = ProcessPoolExecutor(
+            max_workers=whisper_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_whisper,
+            initargs=(self.device, self.compute_type, 4)
+        )
+
+        # Captions are network-bound and fetched in parallel under a shared
+        # request budget. Whisper downloads get one thread per transcription
+        # worker plus WHISPER_PREFETCH more: those threads download the next
+        # files and wait in the process pool queue, so download and
+        # transcription overlap with at most that many files waiting on disk
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.whisper_executor = ThreadPoolExecutor(max_workers=whisper_workers + WHISPER_PREFETCH)
+        self.transcript_limiter = RateLimiter(5)
+
+        # Corpus rows waiting for the next batch insert
+        self.pending_rows: List[Dict] = []
+
+        self.cache = Cache(CACHE_DIR)
+
+    def _migrate_transcript_hash(self):
+        """Add the transcript_hash column and its unique index to older tables and fill it for existing rows"""
+        table = YouTubeTranscriptCorpus.__tablename__
+        index_name = f"ix_{table}_transcript_hash"
+        if index_name in {index['name'] for index in inspect(self.engine).get_indexes(table)}:
+            return
+
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS transcript_hash CHAR(32)"
+            ))
+
+        # Stream the texts on one session and write the hashes in chunks on
+        # another, so only one chunk of transcripts is in memory at a time
+        read_session = self.Session()
+        write_session = self.Session()
+        try:
+            missing = read_session.execute(
+                select(YouTubeTranscriptCorpus.id, YouTubeTranscriptCorpus.transcript_text)
+                .where(YouTubeTranscriptCorpus.transcript_hash.is_(None),
+                       YouTubeTranscriptCorpus.transcript_text.isnot(None))
+                .execution_options(yield_per=1000)
+            )
+            updated = 0
+            for chunk in missing.partitions():
+                write_session.bulk_update_mappings(YouTubeTranscriptCorpus, [
+                    {'id': video_id, 'transcript_hash': transcript_digest(transcript_text)}
+                    for video_id, transcript_text in chunk
+                ])
+                write_session.commit()
+                updated += len(chunk)
+            if updated:
+                logger.info(f"Computed transcript_hash for {updated} existing entries")
+        finally:
+            write_session.close()
+            read_session.close()
+
+        with self.engine.begin() as connection:
+            # Rows stored before the hash existed may repeat a transcript; keep
+            # the hash on the oldest copy only so the unique index can be built
+            duplicates = connection.execute(text(
+                f"UPDATE {table} SET transcript_hash = NULL WHERE id IN ("
+                f"SELECT id FROM (SELECT id, row_number() OVER ("
+                f"PARTITION BY transcript_hash ORDER BY created_at, id) AS copy "
+                f"FROM {table} WHERE transcript_hash IS NOT NULL) AS hashed WHERE copy > 1)"
+            )).rowcount
+            if duplicates:
+                logger.warning(f"Cleared transcript_hash on {duplicates} duplicate transcripts")
+            connection.execute(text(f"CREATE UNIQUE INDEX {index_name} ON {table} (transcript_hash)"))
+
+    def close(self):
+        """Stop the worker threads and transcription processes"""
+        self.executor.shutdown()
+        self.whisper_executor.shutdown()
+        self._whisper_pool.shutdown()
+        self.cache.close()
     
     def search_videos(self, 
                      query: str, 
@@ -85,26 +266,22 @@ class YouTubeTranscriptScraper:
                         break
                     
                     try:
-                        # Get full video info using YouTube
-                        video_url = f"https://youtube.com/watch?v={video.video_id}"
-                        yt = YouTube(video_url)
-                        
-                        # Safely get video duration with fallback
-                        try:
-                            duration = yt.length if yt.length is not None else 0
-                        except Exception:
-                            duration = 0
+                        # Use the metadata the search result already carries; a full
+                        # YouTube(url) is only built when audio has to be downloaded
+                        duration = getattr(video, 'length', 0) or 0
+                        title = getattr(video, 'title', None) or f"Unknown Title ({video.video_id})"
+                        author = getattr(video, 'author', None) or 'Unknown Channel'
                             
                         # Basic content filtering - adjust thresholds as needed
                         if duration > 7200:  # Skip videos longer than 2 hours
-                            logger.info(f"Skipping long video: {yt.title} ({duration} seconds)")
+                            logger.info(f"Skipping long video: {title} ({duration} seconds)")
                             continue
                             
                         # Safely get video metadata with fallbacks
                         video_info = {
                             'id': video.video_id,
-                            'title': getattr(yt, 'title', f"Unknown Title ({video.video_id})"),
-                            'channel_title': getattr(yt, 'author', 'Unknown Channel'),
+                            'title': title,
+                            'channel_title': author,
                             'duration': duration,
                             'published_at': datetime.fromtimestamp(video.publish_date.timestamp()) if video.publish_date else Null  # Fallback since publish date might not be available
                         }
@@ -112,9 +289,6 @@ class YouTubeTranscriptScraper:
                         videos.append(video_info)
                         logger.info(f"Found video: {video_info['title']} (Duration: {video_info['duration']} seconds)")
                         
-                        # Add delay to prevent rate limiting
-                        time.sleep(1)
-                        
                     except Exception as e:
                         logger.error(f"Error processing video {video.video_id}: {str(e)}")
                         continue
@@ -132,7 +306,7 @@ class YouTubeTranscriptScraper:
                             break
                             
                         page_num += 1
-                        time.sleep(1)  # Add delay between pages
+                        time.sleep(SEARCH_PAGE_DELAY)  # Add delay between pages
                         
                     except Exception as e:
                         logger.error(f"Error getting next page: {e}")
@@ -153,20 +327,19 @@ class YouTubeTranscriptScraper:
         :param text: Raw transcript text
         :return: Cleaned transcript text
         """
+        # Fewer than nine separators can never yield ten words; reject before any regex
+        if text.count(' ') + text.count('\n') < 9:
+            return ""
+
         # Remove timestamps, extra whitespaces
-        text = re.sub(r'\d+:\d+:\d+\s*\n', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _CLEAN_RE.sub(' ', text).strip()
         
         # Filter out very short or non-Indonesian looking transcripts
         if len(text.split()) < 10:
             return ""
         
         # Basic Indonesian language detection 
-        indonesian_indicators = [
-            'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
-            'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
-        ]
-        if not any(word in text.lower() for word in indonesian_indicators):
+        if not _ID_RE.search(text):
             return ""
         
         return text
@@ -180,15 +353,43 @@ class YouTubeTranscriptScraper:
         :param preferred_languages: List of preferred language codes
         :return: Transcript dictionary or None
         """
+        transcript_data, needs_whisper = self.get_caption_transcript(video_id, preferred_languages)
+        if needs_whisper:
+            transcript_data = self.get_whisper_transcript(video_id)
+        return transcript_data
+
+    def get_caption_transcript(self, video_id: str,
+                               preferred_languages: List[str] = ['id', 'en']) -> Tuple[Optional[Dict], bool]:
+        """
+        Retrieve a manual or auto-generated caption transcript.
+
+        :param video_id: YouTube video ID
+        :param preferred_languages: List of preferred language codes
+        :return: Transcript dictionary or None, and whether the video has no
+            usable captions and should go to Whisper
+        """
+        cached = self.cache.get(f"transcript:{video_id}")
+        if cached is not None:
+            return cached, False
+
+        transcript_data, needs_whisper = self._fetch_caption_transcript(video_id, preferred_languages)
+        if transcript_data:
+            self.cache.set(f"transcript:{video_id}", transcript_data, expire=CACHE_TTL)
+        return transcript_data, needs_whisper
+
+    def _fetch_caption_transcript(self, video_id: str,
+                                  preferred_languages: List[str]) -> Tuple[Optional[Dict], bool]:
+        """Caption lookup behind get_caption_transcript's cache"""
         try:
             # Attempt to fetch transcript in preferred languages
+            self.transcript_limiter.acquire()
             transcript_list = YouTubeTranscriptApi.get_transcript(
                 video_id, 
                 languages=preferred_languages
             )
             
             # Combine transcript text
-            full_transcript = ' '.join([entry['text'] for entry in transcript_list])
+            full_transcript = ' '.join(entry['text'] for entry in transcript_list)
             cleaned_transcript = self.clean_transcript(full_transcript)
             
             if cleaned_transcript:
@@ -196,16 +397,18 @@ class YouTubeTranscriptScraper:
                     'transcript_text': cleaned_transcript,
                     'language': transcript_list[0].get('language', 'unknown'),
                     'has_caption': True
-                }
+                }, False
 
         except (NoTranscriptFound, TranscriptsDisabled):
             try:
                 # Attempt to fetch auto-generated transcript if available
+                self.transcript_limiter.acquire()
                 available_transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
                 
                 for transcript in available_transcripts:
                     if transcript.is_generated:
-                        full_transcript = ' '.join([entry['text'] for entry in transcript.fetch()])
+                        self.transcript_limiter.acquire()
+                        full_transcript = ' '.join(entry['text'] for entry in transcript.fetch())
                         cleaned_transcript = self.clean_transcript(full_transcript)
                         
                         if cleaned_transcript:
@@ -213,22 +416,33 @@ class YouTubeTranscriptScraper:
                                 'transcript_text': cleaned_transcript,
                                 'language': transcript.language_code,
                                 'has_caption': True
-                            }
+                            }, False
             except Exception:
                 pass
 
-            # Fallback to local Whisper transcription
-            transcript_text = self.get_transcript_with_whisper(video_id)
-            if transcript_text:
-                return {
-                    'transcript_text': transcript_text,
-                    'language': 'id',
-                    'has_caption': False
-                }
+            return None, True
             
         except Exception as e:
             logger.error(f"Unexpected error getting transcript for {video_id}: {e}")
         
+        return None, False
+
+    def get_whisper_transcript(self, video_id: str) -> Optional[Dict]:
+        """
+        Fallback to local Whisper transcription.
+
+        :param video_id: YouTube video ID
+        :return: Transcript dictionary or None
+        """
+        transcript_text = self.get_transcript_with_whisper(video_id)
+        if transcript_text:
+            transcript_data = {
+                'transcript_text': transcript_text,
+                'language': 'id',
+                'has_caption': False
+            }
+            self.cache.set(f"transcript:{video_id}", transcript_data, expire=CACHE_TTL)
+            return transcript_data
         return None
     
     def get_transcript_with_whisper(self, video_id: str) -> Optional[str]:
@@ -243,31 +457,37 @@ class YouTubeTranscriptScraper:
             youtube_url = f"https://www.youtube.com/watch?v={video_id}"
             yt = YouTube(youtube_url)
             
-            download_dir = os.path.join(os.getcwd(), 'downloaded_audio')
-            os.makedirs(download_dir, exist_ok=True)
-            
-            temp_audio_path = os.path.join(download_dir, f"{video_id}.mp3")    
-
             # Retry up to 3 times if there's connection timeout issue
             for attempt in range(3): 
                 try:
                     logger.info(f"Download {yt.title}")
                     
-                    # Get audio stream
-                    audio_stream = yt.streams.filter(only_audio=True).first()
+                    # Get the lowest-bitrate audio stream; Whisper resamples to 16 kHz mono anyway
+                    audio_stream = yt.streams.filter(only_audio=True).order_by('abr').asc().first()
                     if not audio_stream:
                         logger.error(f"No audio stream available for video {video_id}")
                         return None
                         
-                    audio_stream.download(output_path=download_dir, filename=f"{video_id}.mp3")
-                    
-                    if os.path.exists(temp_audio_path) and os.path.getsize(temp_audio_path) > 0:
-                        # Transcribe audio using Whisper
-                        model = whisper.load_model("turbo")
-                        result = model.transcribe(temp_audio_path, language="id")
-                        transcript_text = result['text']
-                        
-                        return self.clean_transcript(transcript_text)
+                    # download() returns the written path and raises on failure
+                    # Keep the original container; ffmpeg decodes it directly.
+                    # Audio-only mp4 streams get the usual .m4a extension
+                    extension = 'm4a' if audio_stream.subtype == 'mp4' else audio_stream.subtype
+                    temp_audio_path = audio_stream.download(output_path=str(self._download_dir),
+                                                            filename=f"{video_id}.{extension}")
+
+                    # Re-uploads of the same audio reuse the earlier transcription
+                    audio_key = f"audio:{audio_digest(temp_audio_path)}"
+                    cached_text = self.cache.get(audio_key)
+                    if cached_text is not None:
+                        logger.info(f"Reusing transcription of identical audio for {video_id}")
+                        return cached_text
+
+                    # Transcribe audio using Whisper in a worker process
+                    transcript_text = self._whisper_pool.submit(_transcribe_audio, temp_audio_path).result()
+
+                    cleaned_transcript = self.clean_transcript(transcript_text)
+                    self.cache.set(audio_key, cleaned_transcript, expire=CACHE_TTL)
+                    return cleaned_transcript
                     
                 except Exception as e:
                     logger.error(f"Retry {attempt + 1} failed for video {video_id}: {e}")
@@ -278,14 +498,84 @@ class YouTubeTranscriptScraper:
         
         finally:
             # Clean up temp file
-            if temp_audio_path and os.path.exists(temp_audio_path):
+            if temp_audio_path:
                 try:
-                    os.remove(temp_audio_path)
+                    Path(temp_audio_path).unlink(missing_ok=True)
                 except Exception as e:
                     logger.error(f"Error removing temporary audio file: {e}")
             
         return None
     
+    def queue_entry(self,
+                    video: Dict,
+                    transcript_data: Optional[Dict],
+                    existing_ids: Set[str]) -> bool:
+        """
+        Queue a corpus entry for the next batch insert unless its transcript
+        is missing. Duplicate transcripts are rejected by the unique
+        transcript_hash index when the batch is flushed.
+
+        :param video: Video metadata from search_videos
+        :param transcript_data: Transcript dictionary or None
+        :param existing_ids: IDs already in the corpus, updated when queued
+        :return: True if the entry was queued
+        """
+        if not transcript_data or not transcript_data['transcript_text']:
+            return False
+
+        video_id = video['id']
+        video_title = video['title']
+        transcript_text = transcript_data['transcript_text']
+
+        self.pending_rows.append({
+            'id': video_id,
+            'title': video_title,
+            'channel_title': video['channel_title'],
+            'published_at': video['published_at'],
+            'duration': video['duration'],
+            'transcript_text': transcript_text,
+            'transcript_hash': transcript_digest(transcript_text),
+            'language': transcript_data.get('language', 'unknown'),
+            'has_caption': transcript_data.get('has_caption', False)
+        })
+        existing_ids.add(video_id)
+        logger.info(f"Processed: {video_title} ({video['duration']}s)")
+        return True
+
+    def flush_pending(self, session) -> int:
+        """
+        Insert the queued corpus rows with one executemany and one commit.
+        If the batch conflicts, retry it row by row so only the offending
+        rows are dropped.
+
+        :param session: Database session
+        :return: Number of rows stored
+        """
+        rows, self.pending_rows = self.pending_rows, []
+        if not rows:
+            return 0
+
+        try:
+            session.bulk_insert_mappings(YouTubeTranscriptCorpus, rows)
+            session.commit()
+            stored = len(rows)
+        except IntegrityError:
+            session.rollback()
+            stored = 0
+            for row in rows:
+                try:
+                    session.bulk_insert_mappings(YouTubeTranscriptCorpus, [row])
+                    session.commit()
+                    stored += 1
+                except IntegrityError as e:
+                    # Same video id or same transcript_hash as a stored row
+                    session.rollback()
+                    constraint = getattr(getattr(e.orig, 'diag', None), 'constraint_name', None)
+                    logger.info(f"Skipping {row['title']}: violates {constraint or e.orig}")
+
+        logger.info(f"Stored batch of {stored} transcripts")
+        return stored
+
     def build_corpus(self, 
                     query: str, 
                     max_results: int = 50, 
@@ -298,61 +588,58 @@ class YouTubeTranscriptScraper:
         :param language: Language preference
         :return: Number of videos processed
         """
+        processed_count = 0
         session = self.Session()
         try:
-            # Search existing entries
-            existing_entries = {entry.id: entry.transcript_text 
-                              for entry in session.query(YouTubeTranscriptCorpus).all()}
+            # Search existing entries; only ids are loaded, duplicate
+            # transcripts are left to the database
+            existing_ids = {video_id for video_id, in
+                            session.query(YouTubeTranscriptCorpus.id).yield_per(1000)}
             
             videos = self.search_videos(query, max_results, language)
-            processed_count = 0
-            
-            for video in videos:
-                video_id = video['id']
-                video_title = video['title']
 
-                if video_id in existing_entries:
-                    logger.info(f"Skipping already processed video: {video_title}")
+            pending_videos = []
+            for video in videos:
+                if video['id'] in existing_ids:
+                    logger.info(f"Skipping already processed video: {video['title']}")
                     continue
-                
-                transcript_data = self.get_transcript(video_id)
+                pending_videos.append(video)
 
-                if transcript_data and transcript_data['transcript_text']:
-                    transcript_text = transcript_data['transcript_text']
-
-                    if any(existing_transcript == transcript_text 
-                          for existing_transcript in existing_entries.values()):
-                        logger.info(f"Skipping duplicate transcript: {video_title}")
-                        continue
+            # Fetch captions in parallel and queue caption-less videos on the
+            # Whisper worker; database writes stay on this thread
+            caption_futures = {
+                self.executor.submit(self.get_caption_transcript, video['id']): video
+                for video in pending_videos
+            }
+            whisper_futures = {}
+            for future in as_completed(caption_futures):
+                video = caption_futures[future]
+                transcript_data, needs_whisper = future.result()
+                if needs_whisper:
+                    whisper_futures[self.whisper_executor.submit(self.get_whisper_transcript, video['id'])] = video
+                    continue
+                self.queue_entry(video, transcript_data, existing_ids)
+                if len(self.pending_rows) >= INSERT_BATCH_SIZE:
+                    processed_count += self.flush_pending(session)
 
-                    corpus_entry = YouTubeTranscriptCorpus(
-                        id=video_id,
-                        title=video_title,
-                        channel_title=video['channel_title'],
-                        published_at=video['published_at'],
-                        duration=video['duration'],
-                        transcript_text=transcript_text,
-                        language=transcript_data.get('language', 'unknown'),
-                        has_caption=transcript_data.get('has_caption', False)
-                    )
-                    
-                    try:
-                        session.add(corpus_entry)
-                        session.commit()
-                        processed_count += 1
-                        logger.info(f"Processed: {video_title} ({video['duration']}s)")
-                    except IntegrityError as e:
-                        session.rollback()
-                        logger.error(f"Database error for {video_id}: {str(e)}")
-
-                # Prevent rate limiting
-                time.sleep(1)
+            for future in as_completed(whisper_futures):
+                video = whisper_futures[future]
+                self.queue_entry(video, future.result(), existing_ids)
+                if len(self.pending_rows) >= INSERT_BATCH_SIZE:
+                    processed_count += self.flush_pending(session)
             
         except Exception as e:
             logger.error(f"Error building corpus: {e}")
             session.rollback()
             
         finally:
+            # Keep rows queued before a failure, but never let the final
+            # write replace the original error
+            try:
+                processed_count += self.flush_pending(session)
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error storing final batch: {e}")
             session.close()
         
         logger.info(f"Processed {processed_count} videos for query '{query}'")
@@ -375,12 +662,15 @@ def main():
     ]
     
     total_processed = 0
-    for query in queries:
-        logger.info(f"Processing query: {query}")
-        processed = scraper.build_corpus(query, max_results=500)
-        total_processed += processed
-        # Add delay between queries
-        time.sleep(2)
+    try:
+        for query in queries:
+            logger.info(f"Processing query: {query}")
+            processed = scraper.build_corpus(query, max_results=500)
+            total_processed += processed
+            # Add delay between queries
+            time.sleep(2)
+    finally:
+        scraper.close()
     
     logger.info(f"Overall total processed videos: {total_processed}")
 
@@ -1,21 +1,32 @@
 import os
-import time
+import asyncio
+import hashlib
 import logging
 import re
-import whisper
+import threading
+import numpy as np
 import torch
 import warnings
 import aiotube
-from pytubefix import YouTube
-from pytubefix.cli import on_progress
-from typing import List, Dict, Optional, Set
+import yt_dlp
+import requests
+import soundfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
+from pathlib import Path
 
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
+from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled
+# Private module: TranscriptListFetcher(http_client) is the 0.6.2 signature that
+# lets caption listing share a pooled session; keep the version pinned
+from youtube_transcript_api._transcripts import TranscriptListFetcher
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Boolean
+from sqlalchemy import create_engine, inspect, select, text, Column, String, Text, DateTime, Boolean, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
@@ -33,8 +44,53 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# clean_transcript patterns and Indonesian indicator words, built once
+_TS_RE = re.compile(r'\d+:\d+:\d+\s*\n')
+_WS_RE = re.compile(r'\s+')
+_ID_WORDS = frozenset({
+    'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
+    'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
+})
+
+# Whisper model size or path of a converted CTranslate2 model directory
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'large-v3-turbo')
+# Directory for downloaded Whisper weights (defaults to the Hugging Face cache);
+# point it at local NVMe or tmpfs to keep cold starts fast
+WHISPER_DOWNLOAD_ROOT = os.getenv('WHISPER_DOWNLOAD_ROOT')
+# CTranslate2 intra-op threads; half the cores leaves room for downloads and ffmpeg
+WHISPER_CPU_THREADS = max(1, (os.cpu_count() or 2) // 2)
+# Whisper expects 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+# Number of 30 s audio chunks decoded together in one Whisper forward pass
+WHISPER_BATCH_SIZE = 16
+# Audio files handed to one batch_whisper_transcribe call
+WHISPER_DRAIN_SIZE = 16
+# Downloaded audio waiting for Whisper before downloads pause
+WHISPER_QUEUE_SIZE = 32
+# Concurrent caption lookups and their overall rate (calls per minute)
+TRANSCRIPT_CONCURRENCY = 10
+TRANSCRIPT_RATE_PER_MINUTE = 50
+# Keep-alive connections shared by the caption requests
+HTTP_POOL_SIZE = 64
+# Concurrent yt-dlp audio downloads
+DOWNLOAD_WORKERS = 8
+# Corpus rows written per INSERT/commit round trip
+INSERT_BATCH_SIZE = 100
+
 Base = declarative_base()
 
+def transcript_digest(text: str) -> bytes:
+    """16-byte BLAKE2b digest used to detect duplicate transcripts"""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+def read_audio(path: str) -> np.ndarray:
+    """Read a 16 kHz mono WAV written by the yt-dlp postprocessor as float32 samples"""
+    audio, sample_rate = soundfile.read(path, dtype='float32')
+    if sample_rate == WHISPER_SAMPLE_RATE and audio.ndim == 1:
+        return audio
+    # The postprocessor did not resample; let PyAV convert it
+    return decode_audio(path, sampling_rate=WHISPER_SAMPLE_RATE)
+
 class YouTubeTranscriptCorpus(Base):
     __tablename__ = 'youtube_transcript_corpus'
     
@@ -43,6 +99,7 @@ class YouTubeTranscriptCorpus(Base):
     channel_title = Column(String(500))
     published_at = Column(DateTime)
     transcript_text = Column(Text)
+    transcript_hash = Column(LargeBinary(16), index=True)
     language = Column(String(10))
     has_caption = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -50,65 +107,173 @@ class YouTubeTranscriptCorpus(Base):
 class YouTubeTranscriptScraper:
     def __init__(self):
         """Initialize YouTube Transcript Scraper with cached data and CUDA support"""
-        # YouTube API setup
-        self.api_key = os.getenv('YOUTUBE_API_KEY')
-        if not self.api_key:
-            raise ValueError("No YouTube API key provided")
-        
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
-        
+        # Search goes through youtube_search, so no Data API client is built
         # Database setup
         self.database_url = os.getenv('DATABASE_URL')
         if not self.database_url:
             raise ValueError("No database URL provided")
         
-        self.engine = create_engine(self.database_url)
+        # Larger compiled-statement cache and psycopg2 execute_values for bulk inserts
+        self.engine = create_engine(
+            self.database_url,
+            query_cache_size=1200,
+            executemany_mode='values_plus_batch',
+            pool_pre_ping=True
+        )
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        self._migrate_transcript_hash()
 
-        # Cache existing video IDs and transcripts
+        # Cache existing video IDs and transcript digests
         self.cached_video_ids: Set[str] = set()
-        self.cached_transcripts: Set[str] = set()
+        self.cached_transcripts: Set[bytes] = set()
         self._load_cache()
 
         # Initialize Whisper model with CUDA if available
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {self.device}")
-        self.whisper_model = None  # Lazy loading
+        # int8 weights everywhere; fp16 activations on GPUs with tensor cores (sm_70+)
+        if self.device == "cuda" and torch.cuda.get_device_capability()[0] >= 7:
+            self.compute_type = "int8_float16"
+        else:
+            self.compute_type = "int8"
+        logger.info(f"Using device: {self.device} ({self.compute_type})")
+        # One Whisper replica per GPU, loaded lazily
+        self.whisper_replicas = torch.cuda.device_count() if self.device == "cuda" else 1
+        self.whisper_models: List[BatchedInferencePipeline] = []
+        self._whisper_lock = threading.Lock()
+
+        # Whisper input files, created once instead of per video
+        self._download_dir = Path.cwd() / 'downloaded_audio'
+        self._download_dir.mkdir(exist_ok=True)
+        self._ydl_options = {
+            'format': 'bestaudio/best',
+            # 16 kHz mono PCM is Whisper's input format, so reading it back needs no resampling
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'wav',
+            }],
+            'postprocessor_args': {'extractaudio': ['-ac', '1', '-ar', '16000']},
+            'outtmpl': f'{self._download_dir}/%(id)s.%(ext)s',
+            'quiet': True,
+            'concurrent_fragment_downloads': 4,
+        }
+        # Audio downloads get their own threads so they never queue behind caption lookups
+        self._download_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+
+        # Replaces the fixed one second pause between videos
+        self.transcript_limiter = AsyncLimiter(TRANSCRIPT_RATE_PER_MINUTE, 60)
+
+        # One pooled session for all caption requests, instead of the new
+        # session (and TLS handshake) YouTubeTranscriptApi opens per call
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+        self._transcript_fetcher = TranscriptListFetcher(self._http)
+
+        # Corpus rows waiting for the next batch insert
+        self.pending_rows: List[Dict] = []
+
+    def _migrate_transcript_hash(self):
+        """Add the transcript_hash column and its index to older tables and fill it for existing rows"""
+        table = YouTubeTranscriptCorpus.__tablename__
+        index_name = f"ix_{table}_transcript_hash"
+        # ALTER TABLE locks the table even when nothing changes, so only run
+        # the DDL that is actually missing
+        inspector = inspect(self.engine)
+        if 'transcript_hash' not in {column['name'] for column in inspector.get_columns(table)}:
+            with self.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN transcript_hash BYTEA"))
+        if index_name not in {index['name'] for index in inspector.get_indexes(table)}:
+            with self.engine.begin() as connection:
+                connection.execute(text(f"CREATE INDEX {index_name} ON {table} (transcript_hash)"))
+
+        # Stream the texts on one session and write the hashes in chunks on
+        # another, so only one chunk of transcripts is in memory at a time
+        read_session = self.Session()
+        write_session = self.Session()
+        try:
+            missing = read_session.execute(
+                select(YouTubeTranscriptCorpus.id, YouTubeTranscriptCorpus.transcript_text)
+                .where(YouTubeTranscriptCorpus.transcript_hash.is_(None),
+                       YouTubeTranscriptCorpus.transcript_text.isnot(None))
+                .execution_options(yield_per=1000, stream_results=True)
+            )
+            updated = 0
+            for chunk in missing.partitions():
+                write_session.bulk_update_mappings(YouTubeTranscriptCorpus, [
+                    {'id': video_id, 'transcript_hash': transcript_digest(transcript_text)}
+                    for video_id, transcript_text in chunk
+                ])
+                write_session.commit()
+                updated += len(chunk)
+            if updated:
+                logger.info(f"Computed transcript_hash for {updated} existing entries")
+        finally:
+            write_session.close()
+            read_session.close()
 
     def _load_cache(self):
-        """Load existing video IDs and transcripts into memory"""
+        """Load existing video IDs and transcript digests into memory, without the transcript texts"""
         session = self.Session()
         try:
-            entries = session.query(YouTubeTranscriptCorpus).all()
-            self.cached_video_ids = {entry.id for entry in entries}  # Change to use `id`
-            self.cached_transcripts = {entry.transcript_text for entry in entries if entry.transcript_text}
+            # Stream plain (id, hash) rows with a server-side cursor instead of ORM objects
+            rows = session.execute(
+                select(YouTubeTranscriptCorpus.id, YouTubeTranscriptCorpus.transcript_hash)
+                .execution_options(yield_per=1000, stream_results=True)
+            )
+            for video_id, transcript_hash in rows:
+                self.cached_video_ids.add(video_id)
+                if transcript_hash is not None:
+                    self.cached_transcripts.add(bytes(transcript_hash))
             logger.info(f"Cached {len(self.cached_video_ids)} video IDs and {len(self.cached_transcripts)} transcripts")
         finally:
             session.close()
 
+    def is_duplicate_transcript(self, transcript_text: str) -> bool:
+        """
+        Check whether a transcript is already stored or queued.
+
+        Stored and queued transcripts are kept as 16-byte digests, so this
+        is an exact set lookup without holding any transcript text.
+        """
+        return transcript_digest(transcript_text) in self.cached_transcripts
+
+    def _create_whisper_model(self, device_index: int) -> WhisperModel:
+        """
+        Create one Whisper replica, loading the weights from the local cache
+        without contacting the Hugging Face Hub when they are already there.
+        """
+        options = dict(device=self.device, device_index=device_index,
+                       compute_type=self.compute_type, num_workers=2,
+                       cpu_threads=WHISPER_CPU_THREADS, download_root=WHISPER_DOWNLOAD_ROOT)
+        try:
+            return WhisperModel(WHISPER_MODEL, local_files_only=True, **options)
+        except FileNotFoundError:
+            logger.info(f"Whisper model {WHISPER_MODEL} not cached yet, downloading")
+            return WhisperModel(WHISPER_MODEL, **options)
+
     def _load_whisper_model(self):
-        """Lazy load Whisper model"""
-        if self.whisper_model is None:
-            self.whisper_model = whisper.load_model("turbo", device=self.device)
-            logger.info("Whisper model loaded successfully")
+        """Lazy load one Whisper model per replica behind a batched inference pipeline"""
+        with self._whisper_lock:
+            if not self.whisper_models:
+                for device_index in range(self.whisper_replicas):
+                    model = self._create_whisper_model(device_index)
+                    self.whisper_models.append(BatchedInferencePipeline(model=model))
+                logger.info(f"Whisper model {WHISPER_MODEL} loaded successfully "
+                            f"({self.whisper_replicas} replica(s))")
 
     def clean_transcript(self, text: str) -> str:
         """Clean and preprocess transcript text"""
         # Remove timestamps, extra whitespaces
-        text = re.sub(r'\d+:\d+:\d+\s*\n', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', _TS_RE.sub('', text)).strip()
         
         # Filter out very short or non-Indonesian looking transcripts
-        if len(text.split()) < 10:
-            return ""
-        
-        # Basic Indonesian language detection 
-        indonesian_indicators = [
-            'yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini', 'itu',
-            'jadi', 'ada', 'tidak', 'sudah', 'akan', 'seperti'
-        ]
-        if not any(word in text.lower() for word in indonesian_indicators):
+        # (basic Indonesian language detection on whole words)
+        words = text.lower().split()
+        if len(words) < 10 or _ID_WORDS.isdisjoint(words):
             return ""
         
         return text
@@ -176,15 +341,12 @@ class YouTubeTranscriptScraper:
         logger.info(f"Total unique videos found after filtering: {len(videos)}")
         return videos
     
-    def get_transcript(self, video_id: str, preferred_languages: List[str] = ['id', 'en']) -> Optional[Dict]:
-        """
-        Retrieve transcript with thorough duplicate checking before any retrieval attempts.
-        If the transcript is disabled, generate it using Whisper.
-        """
+    def _is_stored(self, video_id: str) -> bool:
+        """Check the cache, then the database, for an already stored video"""
         # First check if video already exists in cache
         if video_id in self.cached_video_ids:
             logger.info(f"Skipping transcript retrieval - Video {video_id} already exists in database")
-            return None
+            return True
 
         # Double-check database directly to ensure most up-to-date status
         session = self.Session()
@@ -193,16 +355,45 @@ class YouTubeTranscriptScraper:
             if existing_entry:
                 logger.info(f"Skipping transcript retrieval - Video {video_id} found in database")
                 self.cached_video_ids.add(video_id)
-                return None
+                return True
         finally:
             session.close()
+        return False
+
+    def get_transcript(self, video_id: str, preferred_languages: List[str] = ['id', 'en']) -> Optional[Dict]:
+        """
+        Retrieve transcript with thorough duplicate checking before any retrieval attempts.
+        If the transcript is disabled, generate it using Whisper.
+        """
+        if self._is_stored(video_id):
+            return None
+
+        transcript_data, needs_whisper = self.get_caption_transcript(video_id, preferred_languages)
+        if needs_whisper:
+            transcript_text = self.get_transcript_with_whisper(video_id)
+            if transcript_text:
+                return self._whisper_result(transcript_text)
+            logger.warning(f"Whisper transcription failed for video {video_id}")
+        return transcript_data
+
+    def get_caption_transcript(self, video_id: str,
+                               preferred_languages: List[str] = ['id', 'en']) -> Tuple[Optional[Dict], bool]:
+        """
+        Retrieve the YouTube caption transcript of a video.
 
+        :return: transcript data (or None) and whether the video has no
+            captions and should go to Whisper
+        """
         try:
-            # Step 1: Try to get transcript from YouTube API
-            transcript_list = YouTubeTranscriptApi.get_transcript(
-                video_id, 
-                languages=preferred_languages
-            )
+            # Step 1: One metadata call lists every caption track, so any
+            # caption (even auto-generated, in another language) is used
+            # before the video is sent to Whisper
+            transcripts = self._transcript_fetcher.fetch(video_id)
+            transcript = self._select_transcript(transcripts, preferred_languages)
+            if transcript is None:
+                logger.info(f"No YouTube transcript found for {video_id}, trying Whisper transcription...")
+                return None, True
+            transcript_list = transcript.fetch()
             
             # Combine and clean transcript text
             full_transcript = ' '.join([entry['text'] for entry in transcript_list])
@@ -210,128 +401,325 @@ class YouTubeTranscriptScraper:
             
             if cleaned_transcript:
                 # Check for duplicate transcript content
-                if cleaned_transcript in self.cached_transcripts:
+                if self.is_duplicate_transcript(cleaned_transcript):
                     logger.info(f"Skipping - Duplicate transcript content found for video {video_id}")
-                    return None
+                    return None, False
                 
                 return {
                     'transcript_text': cleaned_transcript,
-                    'language': transcript_list[0].get('language', 'unknown'),
+                    'language': transcript.language_code,
                     'has_caption': True
-                }
+                }, False
 
         except (NoTranscriptFound, TranscriptsDisabled) as e:
             logger.info(f"No YouTube transcript found for {video_id}, trying Whisper transcription...")
-            # Fall back to Whisper transcription
-            transcript_data = self.get_transcript_with_whisper(video_id)
-            
-            if transcript_data:
-                return {
-                    'transcript_text': transcript_data,
-                    'language': 'id',  # Assuming default language for Whisper; modify as needed
-                    'has_caption': False
-                }
-            else:
-                logger.warning(f"Whisper transcription failed for video {video_id}")
+            return None, True
 
         except Exception as e:
             logger.error(f"Error retrieving transcripts for video {video_id}: {e}")
 
-        return None
+        return None, False
 
-    def get_transcript_with_whisper(self, video_id: str) -> Optional[str]:
-        """Retrieve transcript using Whisper with CUDA support"""
-        try:
-            youtube_url = f"https://www.youtube.com/watch?v={video_id}"
-            yt = YouTube(youtube_url, on_progress_callback=on_progress)
-            
-            download_dir = os.path.join(os.getcwd(), 'downloaded_audio')
-            os.makedirs(download_dir, exist_ok=True)
-            
-            temp_audio_path = os.path.join(download_dir, f"{video_id}.mp3")
+    @staticmethod
+    def _select_transcript(transcripts, preferred_languages: List[str]):
+        """
+        Pick a caption track: manual in a preferred language, then generated in a
+        preferred language, then any other track.
 
+        :param transcripts: TranscriptList from list_transcripts
+        :param preferred_languages: List of preferred language codes
+        :return: Transcript, or None if the video has no captions
+        """
+        for find in (transcripts.find_manually_created_transcript,
+                     transcripts.find_generated_transcript):
             try:
-                logger.info(f"Downloading {yt.title}")
-                ys = yt.streams.filter(only_audio=True).first()
-                ys.download(output_path=os.path.dirname(temp_audio_path), 
-                          filename=f"{video_id}.mp3")
+                return find(preferred_languages)
+            except NoTranscriptFound:
+                pass
+        return next(iter(transcripts), None)
+
+    def _whisper_result(self, transcript_text: str) -> Dict:
+        """Wrap a Whisper transcript in the shape returned by get_transcript"""
+        return {
+            'transcript_text': transcript_text,
+            'language': 'id',  # Assuming default language for Whisper; modify as needed
+            'has_caption': False
+        }
+
+    def download_audio(self, video_id: str) -> Optional[Path]:
+        """
+        Download the audio track of a video for Whisper.
 
-                if not os.path.exists(temp_audio_path) or os.path.getsize(temp_audio_path) == 0:
-                    logger.error("Downloaded audio file is empty or not found")
-                    return None
+        :return: path of the audio file, or None if the download failed
+        """
+        try:
+            youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+            # YoutubeDL instances are not thread-safe, the options are shared
+            with yt_dlp.YoutubeDL(self._ydl_options) as ydl:
+                info = ydl.extract_info(youtube_url, download=True)
 
-                # Lazy load Whisper model
-                self._load_whisper_model()
-                
-                # Transcribe with CUDA
-                result = self.whisper_model.transcribe(
-                    temp_audio_path,
-                    language="id",
-                    fp16=torch.cuda.is_available()  # Use FP16 if CUDA available
-                )
-                transcript_text = result['text']
-                
-                return self.clean_transcript(transcript_text)
-                
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_audio_path):
-                    os.remove(temp_audio_path)
+            logger.info(f"Downloaded {info.get('title', video_id)}")
+            # Path of the file left behind by the audio extraction postprocessor
+            downloaded = info['requested_downloads'][0]['filepath']
+            return Path(downloaded)
 
         except Exception as e:
-            logger.error(f"Error during Whisper transcription for video {video_id}: {e}")
+            logger.error(f"Error downloading audio for video {video_id}: {e}")
+            return None
+
+    def batch_whisper_transcribe(self, paths: List[Path], replica: int = 0) -> List[Optional[str]]:
+        """
+        Transcribe downloaded audio files with the batched Whisper pipeline.
+
+        Each file is split into VAD speech chunks that are decoded
+        WHISPER_BATCH_SIZE at a time. The next file is read on a helper
+        thread while the current one is on the model.
+        The files are removed afterwards.
+
+        :param paths: audio files to transcribe
+        :param replica: index of the Whisper model (GPU) to run on
+        :return: cleaned transcripts in the order of paths, None on failure
+        """
+        if not paths:
+            return []
+        try:
+            self._load_whisper_model()
+        except Exception:
+            # Nothing will read the audio, so do not leave it on disk
+            for path in paths:
+                path.unlink(missing_ok=True)
+            raise
+        whisper_model = self.whisper_models[replica]
+
+        transcripts = []
+        with ThreadPoolExecutor(max_workers=1) as decoder:
+            next_audio = decoder.submit(read_audio, str(paths[0]))
+            for i, path in enumerate(paths):
+                audio_future = next_audio
+                if i + 1 < len(paths):
+                    next_audio = decoder.submit(read_audio, str(paths[i + 1]))
+                try:
+                    segments, _ = whisper_model.transcribe(
+                        audio_future.result(),
+                        # Fixed <|id|><|transcribe|> prompt, no language detection pass
+                        language="id",
+                        task="transcribe",
+                        without_timestamps=True,
+                        batch_size=WHISPER_BATCH_SIZE,
+                        # Silero VAD drops silence so only speech chunks reach the decoder
+                        vad_filter=True
+                    )
+                    transcript_text = "".join(segment.text for segment in segments)
+                    transcripts.append(self.clean_transcript(transcript_text))
+                except Exception as e:
+                    logger.error(f"Error during Whisper transcription of {path.name}: {e}")
+                    transcripts.append(None)
+                finally:
+                    # Clean up temp file
+                    path.unlink(missing_ok=True)
+        return transcripts
+
+    def get_transcript_with_whisper(self, video_id: str) -> Optional[str]:
+        """Retrieve transcript using Whisper with CUDA support"""
+        audio_path = self.download_audio(video_id)
+        if audio_path is None:
             return None
+        return self.batch_whisper_transcribe([audio_path])[0]
+
+    def queue_entry(self, video: Dict, transcript_data: Dict):
+        """
+        Queue a corpus row for the next batch insert.
+
+        The caches are updated right away so a repeat of the same video or
+        transcript later in the batch is skipped before it reaches the
+        database.
+        """
+        transcript_text = transcript_data['transcript_text']
+        digest = transcript_digest(transcript_text)
+        self.pending_rows.append({
+            'id': video['id'],
+            'title': video['title'],
+            'channel_title': video['channel_title'],
+            'published_at': video['published_at'],
+            'transcript_text': transcript_text,
+            'transcript_hash': digest,
+            'language': transcript_data.get('language', 'unknown'),
+            'has_caption': transcript_data.get('has_caption', False),
+        })
+        self.cached_video_ids.add(video['id'])
+        self.cached_transcripts.add(digest)
+
+    async def flush_pending(self) -> int:
+        """
+        Write the queued corpus rows in a worker thread, so the pipeline
+        keeps running during the database round trip.
+
+        :return: Number of rows stored
+        """
+        rows, self.pending_rows = self.pending_rows, []
+        if not rows:
+            return 0
+        return await asyncio.to_thread(self._insert_rows, rows)
+
+    def _insert_rows(self, rows: List[Dict]) -> int:
+        """
+        Insert corpus rows with one executemany and one commit on a session
+        of their own. If the batch conflicts, retry it row by row so only
+        the offending rows are dropped.
+
+        :param rows: Corpus rows to insert
+        :return: Number of rows stored
+        """
+        session = self.Session()
+        try:
+            session.bulk_insert_mappings(YouTubeTranscriptCorpus, rows)
+            session.commit()
+            stored = len(rows)
+        except IntegrityError:
+            session.rollback()
+            stored = 0
+            for row in rows:
+                try:
+                    session.bulk_insert_mappings(YouTubeTranscriptCorpus, [row])
+                    session.commit()
+                    stored += 1
+                except IntegrityError as e:
+                    session.rollback()
+                    logger.error(f"Database error for video {row['id']}: {str(e)}")
+        finally:
+            session.close()
 
-    def build_corpus(self, 
+        logger.info(f"Stored batch of {stored} transcripts")
+        return stored
+
+    async def build_corpus(self, 
                     query: str, 
                     max_results: int = 50, 
                     language: str = 'id') -> int:
-        """Build corpus with optimized duplicate checking"""
-        session = self.Session()
+        """
+        Build corpus with optimized duplicate checking.
+
+        Videos go through an asyncio pipeline: caption lookups and audio
+        downloads run concurrently in worker threads and push uncaptioned
+        audio onto a bounded queue. A consumer drains the queue in batches
+        and hands each one to the next free Whisper replica (one per GPU),
+        so network, disk and GPU work overlap.
+        """
         processed_count = 0
+        transcript_sem = asyncio.Semaphore(TRANSCRIPT_CONCURRENCY)
+        whisper_queue: asyncio.Queue = asyncio.Queue(maxsize=WHISPER_QUEUE_SIZE)
+        gpu_queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce(video: Dict):
+            # One failing video must not stop the others
+            try:
+                await produce_video(video)
+            except Exception as e:
+                logger.error(f"Error processing video {video['id']}: {e}")
+
+        async def produce_video(video: Dict):
+            nonlocal processed_count
+            video_id = video['id']
+            async with transcript_sem:
+                if await asyncio.to_thread(self._is_stored, video_id):
+                    return
+                async with self.transcript_limiter:
+                    transcript_data, needs_whisper = await asyncio.to_thread(
+                        self.get_caption_transcript, video_id)
+
+            if needs_whisper:
+                audio_path = await asyncio.get_running_loop().run_in_executor(
+                    self._download_executor, self.download_audio, video_id)
+                if audio_path:
+                    await whisper_queue.put((video, audio_path))
+            elif transcript_data and transcript_data['transcript_text']:
+                # Another producer may have queued the same text since the
+                # worker thread checked it
+                if self.is_duplicate_transcript(transcript_data['transcript_text']):
+                    logger.info(f"Skipping - Duplicate transcript content found for video {video_id}")
+                    return
+                self.queue_entry(video, transcript_data)
+                if len(self.pending_rows) >= INSERT_BATCH_SIZE:
+                    processed_count += await self.flush_pending()
+
+        async def transcribe(batch: List[Tuple[Dict, Path]], replica: int):
+            nonlocal processed_count
+            try:
+                transcripts = await asyncio.to_thread(
+                    self.batch_whisper_transcribe, [path for _, path in batch], replica)
+            except Exception as e:
+                # The audio files are already removed; keep the consumer running
+                logger.error(f"Whisper batch of {len(batch)} videos failed on replica {replica}: {e}")
+                return
+            finally:
+                gpu_queue.put_nowait(replica)
+
+            for (video, _), transcript_text in zip(batch, transcripts):
+                if not transcript_text:
+                    logger.warning(f"Whisper transcription failed for video {video['id']}")
+                    continue
+                if self.is_duplicate_transcript(transcript_text):
+                    logger.info(f"Skipping - Duplicate transcript content found for video {video['id']}")
+                    continue
+                self.queue_entry(video, self._whisper_result(transcript_text))
+            if len(self.pending_rows) >= INSERT_BATCH_SIZE:
+                try:
+                    processed_count += await self.flush_pending()
+                except Exception as e:
+                    logger.error(f"Error storing batch: {e}")
+
+        async def consume():
+            # Hand each batch to whichever Whisper replica frees up first
+            for replica in range(self.whisper_replicas):
+                gpu_queue.put_nowait(replica)
+            tasks = []
+            finished = False
+            while not finished:
+                batch = [await whisper_queue.get()]
+                # The None sentinel is queued after the last producer is done
+                if batch[0] is None:
+                    break
+                replica = await gpu_queue.get()
+                while len(batch) < WHISPER_DRAIN_SIZE and not whisper_queue.empty():
+                    batch.append(whisper_queue.get_nowait())
+                if batch[-1] is None:
+                    finished = True
+                    batch.pop()
+                tasks.append(asyncio.create_task(transcribe(batch, replica)))
+            await asyncio.gather(*tasks)
 
         try:
-            videos = self.search_videos(query, max_results, language)
-            
-            for video in videos:
-                video_id = video['id']
-                
-                # Get transcript (includes duplicate checking)
-                transcript_data = self.get_transcript(video_id)
-                
-                if transcript_data and transcript_data['transcript_text']:
-                    transcript_text = transcript_data['transcript_text']
-                    
-                    corpus_entry = YouTubeTranscriptCorpus(
-                        id=video_id,
-                        title=video['title'],
-                        channel_title=video['channel_title'],
-                        published_at=video['published_at'],
-                        transcript_text=transcript_text,
-                        language=transcript_data.get('language', 'unknown'),
-                        has_caption=transcript_data.get('has_caption', False)
-                    )
-                    
+            videos = await asyncio.to_thread(self.search_videos, query, max_results, language)
+            producers = [asyncio.create_task(produce(video)) for video in videos]
+            consumer = asyncio.create_task(consume())
+
+            def stop_producers(task: asyncio.Task):
+                # Without a consumer the producers would block on a full queue
+                if task.cancelled() or task.exception() is not None:
+                    for producer in producers:
+                        producer.cancel()
+
+            consumer.add_done_callback(stop_producers)
+            try:
+                await asyncio.gather(*producers)
+            except BaseException:
+                for producer in producers:
+                    producer.cancel()
+                raise
+            finally:
+                try:
+                    if not consumer.done():
+                        await whisper_queue.put(None)
+                    await consumer
+                finally:
+                    # Never let the last write replace the original error
                     try:
-                        session.add(corpus_entry)
-                        session.commit()
-                        # Update cache after successful commit
-                        self.cached_video_ids.add(video_id)
-                        self.cached_transcripts.add(transcript_text)
-                        processed_count += 1
-                        logger.info(f"Successfully processed video: {video['title']}")
-                    except IntegrityError as e:
-                        session.rollback()
-                        logger.error(f"Database error for video {video_id}: {str(e)}")
-                
-                time.sleep(1)
+                        processed_count += await self.flush_pending()
+                    except Exception as e:
+                        logger.error(f"Error storing final batch: {e}")
             
         except Exception as e:
             logger.error(f"Error building corpus: {e}")
-            session.rollback()
-            
-        finally:
-            session.close()
         
         logger.info(f"Total processed videos for query '{query}': {processed_count}")
         return processed_count
@@ -354,7 +742,7 @@ def main():
     total_processed = 0
     for query in queries:
         logger.info(f"Processing query: {query}")
-        processed = scraper.build_corpus(query, max_results=500)
+        processed = asyncio.run(scraper.build_corpus(query, max_results=500))
         total_processed += processed
     
     logger.info(f"Overall total processed videos: {total_processed}")
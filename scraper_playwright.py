@@ -1,16 +1,18 @@
 import os
-import time
+import asyncio
 import logging
 import re
-from typing import List, Dict, Optional
-from datetime import datetime, timezone
+from typing import List, Dict, Optional, Set
+from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import create_engine, select, func, text, Column, Integer, String, Text, DateTime, Boolean
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, Browser, TimeoutError as PlaywrightTimeoutError
+
+import youtube_search
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -20,6 +22,50 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Corpus rows written per INSERT/commit round trip
+INSERT_BATCH_SIZE = 500
+
+# Playwright timeouts in milliseconds; short so a missing element fails fast
+PAGE_TIMEOUT = int(os.getenv('PAGE_TIMEOUT_MS', '15000'))
+TRANSCRIPT_CLICK_TIMEOUT = int(os.getenv('TRANSCRIPT_TIMEOUT_MS', '10000'))
+
+# Requests aborted on scraper pages; none of them carry search results or transcript text
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+
+# clean_transcript patterns, compiled once
+_RE_TIME = re.compile(r'\d+:\d+')
+_RE_WS = re.compile(r'\s+')
+_RE_WORD = re.compile(r'\w+')
+_INDICATORS = frozenset(('yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini'))
+
+# Relative "published" labels of search results, e.g. "3 years ago" or "3 tahun yang lalu"
+_RE_RELATIVE_TIME = re.compile(r'(\d+)\s+(\w+)')
+_RELATIVE_UNITS = {
+    'second': timedelta(seconds=1), 'detik': timedelta(seconds=1),
+    'minute': timedelta(minutes=1), 'menit': timedelta(minutes=1),
+    'hour': timedelta(hours=1), 'jam': timedelta(hours=1),
+    'day': timedelta(days=1), 'hari': timedelta(days=1),
+    'week': timedelta(weeks=1), 'minggu': timedelta(weeks=1),
+    'month': timedelta(days=30), 'bulan': timedelta(days=30),
+    'year': timedelta(days=365), 'tahun': timedelta(days=365),
+}
+
+def parse_published_time(text: str, now: datetime) -> Optional[datetime]:
+    """
+    Approximate the publish date from a relative label of the search results.
+
+    :param text: publishedTimeText of a videoRenderer
+    :param now: Reference time the label is relative to
+    :return: Publish date, or None if the label is missing or not understood
+    """
+    match = _RE_RELATIVE_TIME.search(text or '')
+    if not match:
+        return None
+    unit = _RELATIVE_UNITS.get(match.group(2).lower().rstrip('s'))
+    if unit is None:
+        return None
+    return now - int(match.group(1)) * unit
+
 # SQLAlchemy Base and Model
 Base = declarative_base()
 
@@ -34,38 +80,134 @@ class YouTubeTranscriptCorpus(Base):
     transcript_text = Column(Text)
     language = Column(String(10))
     has_caption = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # Naive UTC like published_at, whatever the server time zone is
+    created_at = Column(DateTime, server_default=func.timezone('utc', func.now()))
 
 class YouTubeTranscriptScraper:
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(self, database_url: Optional[str] = None, max_concurrency: int = 5):
         """
         Initialize YouTube Transcript Scraper
         
         :param database_url: PostgreSQL database connection string
+        :param max_concurrency: Maximum number of watch pages scraped at once
         """
+        self.max_concurrency = max_concurrency
         self.database_url = database_url or os.getenv('POSTGRESQL_URL')
         if not self.database_url:
             raise ValueError("No database URL provided")
         
-        self.engine = create_engine(self.database_url)
+        # psycopg2 fast execution helpers: executemany becomes multi-row INSERT ... VALUES
+        self.engine = create_engine(
+            self.database_url,
+            executemany_mode='values_plus_batch',
+            insertmanyvalues_page_size=1000
+        )
         Base.metadata.create_all(self.engine)
+        # Tables created before created_at had a UTC server default; only those
+        # are altered, the ALTER locks the table and needs owner rights
+        with self.engine.begin() as connection:
+            column_default = connection.scalar(text(
+                "SELECT column_default FROM information_schema.columns "
+                "WHERE table_name = :table AND column_name = 'created_at'"
+            ), {'table': YouTubeTranscriptCorpus.__tablename__})
+            if column_default is None or 'timezone' not in column_default:
+                connection.execute(text(
+                    f"ALTER TABLE {YouTubeTranscriptCorpus.__tablename__} "
+                    "ALTER COLUMN created_at SET DEFAULT timezone('utc', now())"
+                ))
         self.Session = sessionmaker(bind=self.engine)
+
+        # Started once by start() and shared by every search and transcript page
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+
+        # Video IDs scraped (or being scraped) in this run, shared by concurrent queries
+        self._seen_video_ids: Set[str] = set()
+
+    async def start(self):
+        """Launch the browser shared by all queries"""
+        # Bounds watch pages across all concurrently running queries
+        self._page_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._playwright = await async_playwright().start()
+        # Use the default installed browser
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            channel="chrome",
+            args=["--disable-dev-shm-usage", "--no-sandbox"]
+        )
+
+    async def close(self):
+        """Close the shared browser and stop Playwright"""
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+    
+    @staticmethod
+    async def _block_heavy_resources(route):
+        """Abort images, media, fonts and stylesheets, let everything else through"""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_context(self):
+        """Open a context of the shared browser that skips heavy resources"""
+        context = await self._browser.new_context()
+        await context.route("**/*", self._block_heavy_resources)
+        return context
     
-    def search_videos(self, query: str, max_results: int = 50) -> List[Dict]:
+    async def search_videos(self, query: str, max_results: int = 50) -> List[Dict]:
+        """
+        Search over plain HTTP by parsing ytInitialData with youtube_search,
+        and fall back to rendering the results page only when that finds nothing.
+
+        :param query: Search query
+        :param max_results: Maximum number of videos to return
+        :return: List of video dicts
+        """
+        raw = await asyncio.to_thread(youtube_search.search_youtube, query, max_results)
+        items = raw.get('items', []) if isinstance(raw, dict) else raw or []
+        # Metadata comes from the same search response; no watch page visit needed.
+        # Naive UTC, so the DateTime column stores it without a time zone shift
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        videos = [{
+            'video_id': item['id'],
+            'title': item['title'],
+            'published_at': parse_published_time(item.get('publishedTimeText'), now) or now,
+            'channel_title': item.get('channelTitle') or "Unknown"
+        } for item in items[:max_results]]
+        if videos:
+            return videos
+
+        logger.info(f"No HTTP search results for '{query}', falling back to the browser")
+        return await self._search_videos_browser(query, max_results)
+
+    async def _search_videos_browser(self, query: str, max_results: int = 50) -> List[Dict]:
+        """Render the search results page in the shared browser and read the video links"""
         videos = []
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)  # Non-headless to debug
-            page = browser.new_page()
+        context = await self._new_context()
+        try:
+            page = await context.new_page()
             
             search_url = f"https://www.youtube.com/results?search_query={query}"
-            page.goto(search_url)
-            time.sleep(3)
+            await page.goto(search_url)
+            try:
+                await page.wait_for_selector('a#video-title', timeout=PAGE_TIMEOUT)
+            except PlaywrightTimeoutError:
+                # No results, or a consent wall in front of them
+                logger.warning(f"No video links rendered for '{query}'")
+                return videos
             
-            video_elements = page.query_selector_all('a#video-title')
+            video_elements = await page.query_selector_all('a#video-title')
+            # Placeholder for the actual publish date, naive UTC like created_at
+            published_at = datetime.now(timezone.utc).replace(tzinfo=None)
             for video_element in video_elements[:max_results]:
-                video_id = video_element.get_attribute('href').split('=')[1]
-                title = video_element.inner_text()
-                published_at = datetime.now(timezone.utc)  # Placeholder for the actual publish date
+                video_id = (await video_element.get_attribute('href')).split('=')[1]
+                title = await video_element.inner_text()
                 videos.append({
                     'video_id': video_id,
                     'title': title,
@@ -74,101 +216,177 @@ class YouTubeTranscriptScraper:
                 })
                 if len(videos) >= max_results:
                     break
-            
-            browser.close()
+        
+        finally:
+            await context.close()
         
         return videos
     
-    def get_transcript(self, video_id: str) -> Optional[str]:
+    @staticmethod
+    async def _click(page, selector: str):
+        """Click an element, retrying once if it does not become clickable in time"""
+        try:
+            await page.click(selector, timeout=TRANSCRIPT_CLICK_TIMEOUT)
+        except PlaywrightTimeoutError:
+            await page.click(selector, timeout=TRANSCRIPT_CLICK_TIMEOUT)
+
+    async def get_transcript(self, video_id: str) -> Optional[str]:
+        """
+        Scrape the transcript panel of one video in its own context of the
+        shared browser; a context is cheap, a browser launch is not.
+
+        :param video_id: YouTube video ID
+        :return: Cleaned transcript, or None
+        """
         transcript_text = None
-        with sync_playwright() as p:
-            # Use the default installed browser
-            browser = p.chromium.launch(headless=False, channel="chrome")  # Launch as Chrome
-            page = browser.new_page()
-            
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            page.goto(video_url)
-            time.sleep(3)
+        context = await self._new_context()
+        
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        try:
+            page = await context.new_page()
+            await page.goto(video_url)
+            await page.wait_for_selector('button[aria-label="More actions"]', timeout=PAGE_TIMEOUT)
             
-            try:
-                # Check for region restriction
-                if "This video can't be played in this browser" in page.content():
-                    logger.warning(f"Video {video_id} restricted in this browser.")
-                    return None
-                
-                # Open transcript
-                page.click('button[aria-label="More actions"]', timeout=60000)
-                time.sleep(1)
-                page.click('tp-yt-paper-item:has-text("Show transcript")', timeout=60000)
-                time.sleep(3)
-                
-                # Gather transcript text
-                transcript_elements = page.query_selector_all('yt-formatted-string.cue')
-                transcript_text = ' '.join([element.inner_text() for element in transcript_elements])
+            # Check for region restriction; the locator runs in the page, no HTML copied over
+            if await page.locator("text=This video can't be played in this browser").first.is_visible():
+                logger.warning(f"Video {video_id} restricted in this browser.")
+                return None
             
-            except PlaywrightTimeoutError:
-                logger.error(f"Timeout while retrieving transcript for video {video_id}")
-            except Exception as e:
-                logger.error(f"Error retrieving transcript for video {video_id}: {e}")
+            # Open transcript
+            await self._click(page, 'button[aria-label="More actions"]')
+            await page.wait_for_selector('tp-yt-paper-item:has-text("Show transcript")', timeout=PAGE_TIMEOUT)
+            await self._click(page, 'tp-yt-paper-item:has-text("Show transcript")')
+            await page.wait_for_selector('yt-formatted-string.cue', timeout=PAGE_TIMEOUT)
             
-            finally:
-                browser.close()
+            # Gather transcript text in one round trip; textContent skips layout
+            transcript_text = await page.eval_on_selector_all(
+                'yt-formatted-string.cue',
+                '(elements) => elements.map(e => e.textContent).join(" ")'
+            )
+        
+        except PlaywrightTimeoutError:
+            logger.error(f"Timeout while retrieving transcript for video {video_id}")
+        except Exception as e:
+            logger.error(f"Error retrieving transcript for video {video_id}: {e}")
+        
+        finally:
+            await context.close()
         
         if transcript_text:
             return self.clean_transcript(transcript_text)
         return None
+
+    async def _scrape_all(self, videos: List[Dict]) -> List[Optional[str]]:
+        """
+        Scrape the transcripts of all videos concurrently in the shared
+        browser, at most max_concurrency pages at a time.
+
+        :param videos: Videos from search_videos
+        :return: Transcripts in the order of videos, None where scraping failed
+        """
+        async def scrape(video_id: str) -> Optional[str]:
+            async with self._page_semaphore:
+                return await self.get_transcript(video_id)
+
+        return await asyncio.gather(*(scrape(video['video_id']) for video in videos))
     
     def clean_transcript(self, text: str) -> str:
-        text = re.sub(r'\d+:\d+', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _RE_WS.sub(' ', _RE_TIME.sub('', text)).strip()
         
-        indonesian_indicators = ['yang', 'dari', 'dengan', 'untuk', 'dalam', 'pada', 'ini']
-        if any(word in text.lower() for word in indonesian_indicators):
+        # Hash lookups of the words, stopping at the first indicator
+        words = (match.group().lower() for match in _RE_WORD.finditer(text))
+        if not _INDICATORS.isdisjoint(words):
             return text
         return ""
     
-    def build_corpus(self, query: str, max_results: int = 50) -> int:
-        videos = self.search_videos(query, max_results)
+    def flush_pending(self, session, pending: List[Dict]) -> int:
+        """
+        Insert the queued corpus rows in one statement and one commit.
+        ON CONFLICT DO NOTHING lets the database drop videos that are
+        already stored, without a failed INSERT and rollback per duplicate.
+
+        :param session: Database session
+        :param pending: Queued corpus rows, emptied on return
+        :return: Number of rows stored
+        """
+        rows = pending[:]
+        pending.clear()
+        if not rows:
+            return 0
+
+        stored = session.execute(
+            insert(YouTubeTranscriptCorpus)
+            .on_conflict_do_nothing(index_elements=['video_id'])
+            .returning(YouTubeTranscriptCorpus.video_id),
+            rows
+        ).scalars().all()
+        session.commit()
+
+        if len(stored) < len(rows):
+            logger.warning(f"Skipped {len(rows) - len(stored)} duplicate videos")
+        logger.info(f"Stored batch of {len(stored)} transcripts")
+        return len(stored)
+
+    def _unscraped_videos(self, session, videos: List[Dict]) -> List[Dict]:
+        """
+        Drop videos that are already in the corpus (one indexed IN query on
+        video_id) or already being scraped for another query in this run.
+
+        :param session: Database session
+        :param videos: Videos from search_videos
+        :return: Videos that still need their watch page scraped
+        """
+        video_ids = [video['video_id'] for video in videos]
+        stored = set(session.execute(
+            select(YouTubeTranscriptCorpus.video_id).where(YouTubeTranscriptCorpus.video_id.in_(video_ids))
+        ).scalars()) if video_ids else set()
+
+        remaining = []
+        for video in videos:
+            if video['video_id'] in stored or video['video_id'] in self._seen_video_ids:
+                logger.info(f"Skipping already scraped video: {video['video_id']}")
+                continue
+            self._seen_video_ids.add(video['video_id'])
+            remaining.append(video)
+        return remaining
+
+    async def build_corpus(self, query: str, max_results: int = 50) -> int:
+        logger.info(f"Processing query: {query}")
         processed_count = 0
+        pending = []
         session = self.Session()
         
         try:
-            for video in videos:
-                transcript_text = self.get_transcript(video['video_id'])
-                
+            videos = await self.search_videos(query, max_results)
+            videos = self._unscraped_videos(session, videos)
+            transcripts = await self._scrape_all(videos)
+            for video, transcript_text in zip(videos, transcripts):
                 if transcript_text:
-                    corpus_entry = YouTubeTranscriptCorpus(
-                        video_id=video['video_id'],
-                        title=video['title'],
-                        channel_title=video['channel_title'],
-                        published_at=video['published_at'],
-                        transcript_text=transcript_text,
-                        language='id',
-                        has_caption=True
-                    )
-                    
-                    try:
-                        session.add(corpus_entry)
-                        session.commit()
-                        processed_count += 1
-                        logger.info(f"Processed video: {video['title']}")
-                    except IntegrityError:
-                        session.rollback()
-                        logger.warning(f"Duplicate video: {video['video_id']}")
-                
-                time.sleep(0.5)
+                    pending.append({
+                        'video_id': video['video_id'],
+                        'title': video['title'],
+                        'channel_title': video['channel_title'],
+                        'published_at': video['published_at'],
+                        'transcript_text': transcript_text,
+                        'language': 'id',
+                        'has_caption': True
+                    })
+                    logger.info(f"Processed video: {video['title']}")
+                    if len(pending) >= INSERT_BATCH_SIZE:
+                        processed_count += self.flush_pending(session, pending)
         
         except Exception as e:
             logger.error(f"Error building corpus: {e}")
             session.rollback()
         
         finally:
+            processed_count += self.flush_pending(session, pending)
             session.close()
         
         logger.info(f"Total processed videos for query '{query}': {processed_count}")
         return processed_count
 
-def main():
+async def main():
     scraper = YouTubeTranscriptScraper()
     
     queries = [
@@ -178,15 +396,25 @@ def main():
         "Peringatan Dini Bencana Alam",
     ]
     
-    total_processed = 0
-    for query in queries:
-        logger.info(f"Processing query: {query}")
-        processed = scraper.build_corpus(query, max_results=3)
-        total_processed += processed
+    await scraper.start()
+    try:
+        # Queries are independent; each build_corpus uses its own Session and
+        # the scraper-wide page semaphore keeps the browser load bounded
+        # A failing query must not close the browser under the others
+        totals = await asyncio.gather(*(scraper.build_corpus(query, max_results=3) for query in queries),
+                                      return_exceptions=True)
+        total_processed = 0
+        for query, total in zip(queries, totals):
+            if isinstance(total, BaseException):
+                logger.error(f"Query '{query}' failed: {total}")
+            else:
+                total_processed += total
+    finally:
+        await scraper.close()
     
     logger.info(f"Overall total processed videos: {total_processed}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
 
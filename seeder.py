@@ -1,5 +1,4 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
@@ -9,22 +8,27 @@ load_dotenv()
 NEW_DATABASE_URL = os.getenv('DATABASE_URL')
 
 engine = create_engine(NEW_DATABASE_URL)
-Session = sessionmaker(bind=engine)
+
+SEED_TABLE = 'youtube_transcript_corpus'
 
 def seed_database_from_file(sql_file_path: str):
-    session = Session()
+    # Straight to the psycopg2 connection: one COPY or one multi-statement
+    # execute, committed as a single transaction
+    raw_connection = engine.raw_connection()
     try:
-        with open(sql_file_path, "r", encoding="utf-8") as file:
-            sql_commands = file.read()
-        
-        with engine.connect() as connection:
-            connection.execute(sql_commands)
+        with raw_connection.cursor() as cursor, open(sql_file_path, "r", encoding="utf-8") as file:
+            if sql_file_path.endswith('.csv'):
+                cursor.copy_expert(f"COPY {SEED_TABLE} FROM STDIN WITH (FORMAT csv, HEADER)", file)
+            else:
+                cursor.execute(file.read())
+        raw_connection.commit()
         
         print("Database seeded successfully from SQL file!")
     except Exception as e:
+        raw_connection.rollback()
         print(f"Error seeding database: {e}")
     finally:
-        session.close()
+        raw_connection.close()
 
 if __name__ == "__main__":
     seed_database_from_file("youtube_transcript_corpus.sql")
@@ -1,32 +1,71 @@
+import re
+import orjson
 import requests
-import json
 from typing import List, Dict
+from requests.adapters import HTTPAdapter
 
 YOUTUBE_ENDPOINT = "https://www.youtube.com"
+REQUEST_TIMEOUT = 10
+STREAM_CHUNK_SIZE = 65536
+
+# Shared across calls so repeated searches reuse keep-alive TLS connections
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'Accept-Language': 'id-ID,id;q=0.9',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
+})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+# Compiled once; each field is found in a single scan of the raw page bytes
+_INIT_MARKER = b'var ytInitialData'
+_RE_INIT = re.compile(rb'var ytInitialData\s*=\s*(\{.*?\});\s*</script>', re.S)
+_RE_KEY = re.compile(rb'"innertubeApiKey"\s*:\s*"([^"]+)"')
+_RE_CTX = re.compile(rb'"INNERTUBE_CONTEXT"\s*:\s*(\{.*?\}),\s*"INNERTUBE_CONTEXT_CLIENT_NAME"', re.S)
+
+
+def _read_until_init_data(response) -> bytes:
+    """
+    Buffer the response body only up to the end of the ytInitialData script;
+    the rest of the page (player config, footer) is read and discarded
+    rather than copied and scanned. Draining it lets the keep-alive
+    connection go back to the pool instead of being closed.
+    The ytcfg block with the API key and context comes before it.
+    """
+    buffer = bytearray()
+    start = -1
+    chunks = response.iter_content(STREAM_CHUNK_SIZE)
+    for chunk in chunks:
+        # Markers may straddle two chunks, so rescan the tail of the previous one
+        scan_from = max(len(buffer) - len(_INIT_MARKER), 0)
+        buffer += chunk
+        if start < 0:
+            start = buffer.find(_INIT_MARKER, scan_from)
+        if start >= 0 and buffer.find(b'</script>', max(start, scan_from)) >= 0:
+            break
+    for _ in chunks:
+        pass
+    return bytes(buffer)
 
 
 def get_youtube_init_data(url: str):
     try:
-        page = requests.get(url)
-        data = page.text
+        # Raw bytes: regex and orjson work on them directly, no str decode of the page
+        with _SESSION.get(url, timeout=REQUEST_TIMEOUT, stream=True) as page:
+            data = _read_until_init_data(page)
 
         # Extract ytInitialData
-        init_data_split = data.split("var ytInitialData =")
-        if len(init_data_split) > 1:
-            init_data_json = init_data_split[1].split("</script>")[0].strip()[:-1]
-            init_data = json.loads(init_data_json)
+        init_data_match = _RE_INIT.search(data)
+        if init_data_match:
+            init_data = orjson.loads(init_data_match.group(1))
 
             # Extract API token
-            api_token_split = data.split("innertubeApiKey")
-            api_token = (
-                api_token_split[1].split(",")[0].split('"')[2] if len(api_token_split) > 1 else None
-            )
+            api_token_match = _RE_KEY.search(data)
+            api_token = api_token_match.group(1).decode() if api_token_match else None
 
             # Extract INNERTUBE context
-            context_split = data.split("INNERTUBE_CONTEXT")
-            context = (
-                json.loads(context_split[1].strip()[2:-2]) if len(context_split) > 1 else None
-            )
+            context_match = _RE_CTX.search(data)
+            context = orjson.loads(context_match.group(1)) if context_match else None
 
             return {"initdata": init_data, "apiToken": api_token, "context": context}
 
@@ -99,6 +138,7 @@ def search_youtube(query: str, max_results: int = 10):
                         "title": video_renderer['title']['runs'][0]['text'],
                         "channelTitle": video_renderer.get('ownerText', {}).get('runs', [{}])[0].get('text', ''),
                         "length": video_renderer.get('lengthText', {}).get('simpleText', ''),
+                        "publishedTimeText": video_renderer.get('publishedTimeText', {}).get('simpleText', ''),
                         "isLive": 'LIVE' in video_renderer.get('badges', [{}])[0].get('metadataBadgeRenderer', {}).get('style', ''),
                     })
                     if len(items) >= max_results: